@@ -0,0 +1,301 @@
+import csv
+import random
+import datetime
+import warnings
+
+from xml.sax.saxutils import escape
+
+from webcash.utils.records import Record, format_amount
+
+
+IBAN = "12 3456 7890 1234 5678 9012 3456"
+
+DESCRIPTIONS = (
+    "Zakup kartą Żabka",
+    "Przelew wychodzący czynsz",
+    "Wypłata z bankomatu Łódź",
+    "Opłata za prowadzenie rachunku",
+    "Przelew przychodzący wynagrodzenie",
+    "Płatność BLIK sklep internetowy",
+)
+
+
+def synthesize(size, seed=0, start=datetime.date(2020, 1, 1), currency="PLN"):
+    rng = random.Random(seed)
+    span = max(size // 10, 30)
+    start = start.toordinal()
+
+    return sorted(
+        (
+            Record(
+                start + rng.randrange(span),
+                rng.choice((-1, -1, -1, 1)) * rng.randrange(100, 500000),
+                currency,
+                f"{rng.choice(DESCRIPTIONS)} {index}",
+            )
+            for index in range(size)
+        ),
+        key=lambda record: record.date,
+    )
+
+
+def decimal_comma(amount):
+    return format_amount(amount).replace(".", ",")
+
+
+def thousands(amount):
+    integral, fraction = decimal_comma(amount).split(",")
+    sign, integral = ("-", integral[1:]) if integral.startswith("-") else ("", integral)
+    groups = []
+    while integral:
+        groups.insert(0, integral[-3:])
+        integral = integral[:-3]
+    return f"{sign}{' '.join(groups)},{fraction}"
+
+
+def write_mbank(fn, records, encoding="cp1250", iban=IBAN):
+    with open(fn, "w", encoding=encoding, newline="") as outfile:
+        outfile.write(
+            f"mBank S.A. Bankowość Detaliczna;\n#Numer rachunku;\n{iban};\n\n"
+        )
+        outfile.write(
+            "#Data operacji;#Opis operacji;#Rachunek;#Kategoria;#Kwota;"
+            "#Saldo po operacji;\n"
+        )
+        for record in records:
+            outfile.write(
+                f"{record.day};{record.description};eKonto {iban[-4:]};Inne;"
+                f"{thousands(record.amount)} {record.currency};0,00 PLN;\n"
+            )
+
+
+def write_santander(fn, records, encoding="utf-8", iban=IBAN):
+    with open(fn, "w", encoding=encoding, newline="") as outfile:
+        writer = csv.writer(outfile, delimiter=",")
+        first, last = records[0].day, records[-1].day
+        writer.writerow(
+            (
+                first.strftime("%d-%m-%Y"),
+                last.strftime("%d-%m-%Y"),
+                f"'{iban}'",
+                "Konto Santander",
+                "Jan Kowalski",
+                "PLN",
+                "0,00",
+                len(records),
+            )
+        )
+        for record in records:
+            date = record.day.strftime("%d-%m-%Y")
+            writer.writerow(
+                (
+                    date,
+                    date,
+                    record.description,
+                    "",
+                    "",
+                    decimal_comma(record.amount),
+                    "0,00",
+                    1,
+                    "",
+                )
+            )
+
+
+def write_ing(fn, records, encoding="cp1250", iban=IBAN):
+    with open(fn, "w", encoding=encoding, newline="") as outfile:
+        outfile.write(f'"Lista transakcji";\n"Numer rachunku";"{iban}";\n\n')
+        writer = csv.writer(outfile, delimiter=";")
+        writer.writerow(
+            (
+                "Data transakcji",
+                "Data księgowania",
+                "Dane kontrahenta",
+                "Tytuł",
+                *(f"Kolumna {index}" for index in range(4, 21)),
+            )
+        )
+        for record in records:
+            date = str(record.day)
+            writer.writerow(
+                (
+                    date,
+                    date,
+                    "Kontrahent",
+                    record.description,
+                    *[""] * 4,
+                    decimal_comma(record.amount),
+                    "PLN",
+                    *[""] * 11,
+                )
+            )
+
+
+def write_nest(fn, records, encoding="utf-8", iban=IBAN):
+    with open(fn, "w", encoding=encoding, newline="") as outfile:
+        outfile.write(f"Rachunek,{iban}\n")
+        writer = csv.writer(outfile, delimiter=",")
+        for record in records:
+            writer.writerow(
+                (
+                    record.day.strftime("%d-%m-%Y"),
+                    record.day.strftime("%d-%m-%Y"),
+                    "Przelew",
+                    format_amount(record.amount),
+                    "PLN",
+                    "",
+                    "",
+                    record.description,
+                    "",
+                    "",
+                )
+            )
+
+
+def write_revolut(fn, records, encoding="utf-8", iban=IBAN):
+    with open(fn, "w", encoding=encoding, newline="") as outfile:
+        writer = csv.writer(outfile, delimiter=",")
+        writer.writerow(
+            (
+                "Type",
+                "Product",
+                "Started Date",
+                "Completed Date",
+                "Description",
+                "Amount",
+                "Fee",
+                "Currency",
+                "State",
+                "Balance",
+            )
+        )
+        for record in records:
+            writer.writerow(
+                (
+                    "CARD_PAYMENT",
+                    "Current",
+                    f"{record.day} 12:00:00",
+                    f"{record.day} 12:00:00",
+                    record.description,
+                    format_amount(record.amount),
+                    "0.00",
+                    record.currency,
+                    "COMPLETED",
+                    "0.00",
+                )
+            )
+
+
+def write_toyota(fn, records, encoding="utf-8", iban=IBAN):
+    with open(fn, "w", encoding=encoding) as outfile:
+        outfile.write(
+            f'<?xml version="1.0" encoding="{encoding}"?>\n'
+            f"<wyciag><rachunek>{iban}</rachunek><operacje>\n"
+        )
+        for record in records:
+            outfile.write(
+                f"<operacja><data_ksiegowa>{record.day}</data_ksiegowa>"
+                f"<strona>{'MA' if record.amount > 0 else 'WN'}</strona>"
+                f"<kwota>{format_amount(abs(record.amount))}</kwota>"
+                f"<tresc1>{escape(record.description)}</tresc1></operacja>\n"
+            )
+        outfile.write("</operacje></wyciag>\n")
+
+
+writers = {
+    "mBank": (write_mbank, "csv"),
+    "Santander": (write_santander, "csv"),
+    "ING": (write_ing, "csv"),
+    "Nest": (write_nest, "csv"),
+    "Revolut": (write_revolut, "csv"),
+    "Toyota": (write_toyota, "xml"),
+}
+
+
+def build_book(fn, records, matched=0.9, mismatched=0.1, jitter=3, seed=0):
+    import piecash
+
+    rng = random.Random(seed)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+
+        book = piecash.create_book(fn, currency="PLN", overwrite=True)
+        currencies = {"PLN": book.default_currency}
+
+        def account(name, type, currency, parent):
+            if currency not in currencies:
+                currencies[currency] = piecash.factories.create_currency_from_ISO(
+                    currency
+                )
+            return piecash.Account(name, type, currencies[currency], parent)
+
+        pln = book.default_currency
+        assets = piecash.Account(
+            "Assets", "ASSET", pln, book.root_account, placeholder=True
+        )
+        bank = piecash.Account("Bank", "BANK", pln, assets, placeholder=True)
+        expenses = piecash.Account(
+            "Expenses", "EXPENSE", pln, book.root_account, placeholder=True
+        )
+        unknown = piecash.Account("Unknown", "EXPENSE", pln, expenses, placeholder=True)
+
+        pairs = {}
+
+        def split(record):
+            if record.currency not in pairs:
+                pairs[record.currency] = (
+                    account(record.currency, "BANK", record.currency, bank),
+                    account(record.currency, "EXPENSE", record.currency, unknown),
+                )
+            source, target = pairs[record.currency]
+            piecash.Transaction(
+                currency=currencies[record.currency],
+                description=record.description,
+                post_date=record.day,
+                splits=[
+                    piecash.Split(account=source, value=record.value),
+                    piecash.Split(account=target, value=-record.value),
+                ],
+            )
+
+        for record in records:
+            if rng.random() < matched:
+                split(
+                    Record(
+                        record.date + rng.randint(-jitter, jitter),
+                        record.amount,
+                        record.currency,
+                        f"{record.description} (book)",
+                    )
+                )
+
+        first, last = records[0].date, records[-1].date
+        for index in range(int(len(records) * mismatched)):
+            split(
+                Record(
+                    rng.randint(first, last),
+                    rng.randrange(-500000, -100),
+                    rng.choice(sorted({record.currency for record in records})),
+                    f"Only in book {index}",
+                )
+            )
+
+        book.save()
+        book.close()
+
+
+def write_configuration(fn, book, iban=IBAN, format="mBank"):
+    with open(fn, "w", encoding="utf-8") as outfile:
+        outfile.write(
+            "options:\n"
+            "  cache: false\n"
+            "connections:\n"
+            f"  benchmark: sqlite:///{book}\n"
+            "importers:\n"
+            f"  {iban.replace(' ', '')}:\n"
+            f"    format: {format}\n"
+            "    connection: benchmark\n"
+            '    account: "Assets:Bank:*"\n'
+            '    update: "Expenses:Unknown:*"\n'
+        )
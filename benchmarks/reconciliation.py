@@ -0,0 +1,168 @@
+import time
+import random
+import datetime
+
+from collections import defaultdict
+
+import click
+import tabulate
+
+from webcash.utils.reconciliation import Reconciliation
+from webcash.utils.records import Record, format_amount
+
+
+def synthesize(size, seed=0):
+    rng = random.Random(seed)
+    start = datetime.date(2020, 1, 1).toordinal()
+    span = max(size // 20, 30)
+
+    statement = [
+        Record(
+            start + rng.randrange(span),
+            rng.choice((-1, 1)) * rng.randrange(1, 5000),
+            "PLN",
+            f"statement {index}",
+        )
+        for index in range(size)
+    ]
+
+    book = [
+        Record(record.date + rng.randint(-3, 3), record.amount, record.currency, "book")
+        for record in statement
+        if rng.random() < 0.9
+    ]
+    book.extend(
+        Record(
+            start + rng.randrange(span), rng.randrange(5000, 10000), "PLN", "unmatched"
+        )
+        for _ in range(size // 10)
+    )
+    book.sort(key=lambda record: record.date, reverse=True)
+
+    return statement, book
+
+
+def probing(statement, book, epsilon):
+    transactions = defaultdict(list)
+    for record in statement:
+        transactions[(record.day, f"{record.value:.2f}", record.currency)].append(
+            record.description
+        )
+
+    messages = []
+    from_date = min(transactions)[0]
+    to_date = max(transactions)[0]
+
+    for record in book:
+        date, amount = record.day, f"{record.value:.2f}"
+        currency, description = record.currency, record.description
+
+        for shift in (
+            int((x // 2 - x) * (x % 2 * 2 - 1)) for x in range(epsilon * 2 + 1)
+        ):
+            shifted_date = date + datetime.timedelta(days=shift)
+            if transactions.get((shifted_date, amount, currency)):
+                transactions[(shifted_date, amount, currency)].pop()
+                if shift:
+                    messages.append(
+                        (
+                            date,
+                            amount,
+                            currency,
+                            description,
+                            f"\N{RIGHTWARDS ARROW} {shifted_date}",
+                        )
+                    )
+                break
+        else:
+            if from_date <= date <= to_date:
+                messages.append((date, amount, currency, description, "GNUCASH"))
+
+    for (date, amount, currency), descriptions in transactions.items():
+        for description in descriptions:
+            messages.append((date, amount, currency, description, "EXPORT"))
+
+    return messages
+
+
+def indexed(statement, book, epsilon):
+    return [
+        (
+            record.day,
+            format_amount(record.amount),
+            record.currency,
+            record.description,
+            status,
+        )
+        for record, status in Reconciliation(statement, epsilon).reconcile(book)
+        if status != "DUPLICATE"
+    ]
+
+
+def measure(function, *args, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+@click.command()
+@click.option(
+    "--sizes",
+    default="1000,10000,100000",
+    show_default=True,
+    help="Comma separated statement sizes.",
+)
+@click.option(
+    "--epsilons",
+    default="3,7,30,90",
+    show_default=True,
+    help="Comma separated matching windows (days).",
+)
+@click.option("--repeat", default=3, show_default=True, help="Runs per measurement.")
+def benchmark(sizes, epsilons, repeat):
+    rows = []
+
+    for size in map(int, sizes.split(",")):
+        statement, book = synthesize(size)
+
+        for epsilon in map(int, epsilons.split(",")):
+            old, expected = measure(probing, statement, book, epsilon, repeat=repeat)
+            new, actual = measure(indexed, statement, book, epsilon, repeat=repeat)
+
+            if sorted(expected) != sorted(actual):
+                raise click.ClickException(
+                    f"Results differ for size={size}, epsilon={epsilon}."
+                )
+
+            rows.append(
+                (
+                    size,
+                    epsilon,
+                    old * 1e3,
+                    new * 1e3,
+                    new / (size + len(book)) * 1e6,
+                    old / new,
+                )
+            )
+
+    print(
+        tabulate.tabulate(
+            rows,
+            headers=(
+                "Rows",
+                "Epsilon",
+                "Probing [ms]",
+                "Indexed [ms]",
+                "Indexed [us/row]",
+                "Speedup",
+            ),
+            floatfmt=".2f",
+        )
+    )
+
+
+if __name__ == "__main__":
+    benchmark()
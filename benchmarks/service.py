@@ -0,0 +1,174 @@
+import os
+import time
+import random
+import asyncio
+import datetime
+import tempfile
+import warnings
+
+import click
+import aiohttp
+import tabulate
+
+from aiohttp.test_utils import TestServer
+from ruamel.yaml import YAML
+
+from generators import build_book, synthesize, write_configuration, writers
+
+from webcash.service import create_app
+
+
+def percentile(values, fraction):
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def scenarios(statement, seed=0):
+    rng = random.Random(seed)
+    first, last = statement[0].date, statement[-1].date
+
+    def accounts():
+        pattern = rng.choice(("*", "Assets:*", "Assets:Bank:*", "Expenses:*"))
+        return "GET", "/books/benchmark/accounts", {"pattern": pattern}, None
+
+    def transactions():
+        start = rng.randint(first, last)
+        return (
+            "GET",
+            "/books/benchmark/transactions",
+            {
+                "account": "Assets:Bank:*",
+                "from": str(datetime.date.fromordinal(start)),
+                "to": str(datetime.date.fromordinal(start + 30)),
+            },
+            None,
+        )
+
+    return {"accounts": accounts, "transactions": transactions}
+
+
+async def load(url, scenarios, weights, requests, concurrency, upload=None):
+    latencies = {name: [] for name in scenarios}
+    errors = {name: 0 for name in scenarios}
+    names = random.Random(1).choices(list(scenarios), weights, k=requests)
+    if upload is not None:
+        # Every twentieth request uploads a statement.
+        latencies["statements"], errors["statements"] = [], 0
+        for index in range(0, requests, 20):
+            names[index] = "statements"
+
+    queue = asyncio.Queue()
+    for name in names:
+        queue.put_nowait(name)
+
+    async def worker(session):
+        while not queue.empty():
+            name = queue.get_nowait()
+            if name == "statements":
+                method, path, params, data = "POST", "/statements", {}, upload
+            else:
+                method, path, params, data = scenarios[name]()
+
+            start = time.perf_counter()
+            async with session.request(
+                method, url + path, params=params, data=data
+            ) as response:
+                await response.read()
+                if response.status != 200:
+                    errors[name] += 1
+            latencies[name].append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    async with aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(limit=concurrency)
+    ) as session:
+        await asyncio.gather(*(worker(session) for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return elapsed, latencies, errors
+
+
+async def run(directory, size, requests, concurrency, workers, url):
+    statement = synthesize(size)
+    upload = os.path.join(directory, "mBank.csv")
+    writers["mBank"][0](upload, statement[: min(size, 500)])
+    with open(upload, "rb") as infile:
+        data = infile.read()
+
+    if url is not None:
+        return await load(
+            url, scenarios(statement), (1, 3), requests, concurrency, data
+        )
+
+    book = os.path.join(directory, "book.gnucash")
+    build_book(book, statement)
+    configuration = os.path.join(directory, "configuration.yaml")
+    write_configuration(configuration, book)
+
+    with open(configuration, encoding="utf-8") as infile:
+        app = create_app(YAML().load(infile), workers=workers)
+
+    async with TestServer(app) as server:
+        return await load(
+            str(server.make_url("/")).rstrip("/"),
+            scenarios(statement),
+            (1, 3),
+            requests,
+            concurrency,
+            data,
+        )
+
+
+@click.command()
+@click.option("--size", default=10000, show_default=True, help="Book transactions.")
+@click.option("--requests", default=2000, show_default=True)
+@click.option("--concurrency", default=32, show_default=True)
+@click.option(
+    "--workers",
+    default=4,
+    show_default=True,
+    help="Service threads (ignored with --url).",
+)
+@click.option("--url", help="Load an already running service instead.")
+def benchmark(size, requests, concurrency, workers, url):
+    warnings.simplefilter("ignore")
+
+    with tempfile.TemporaryDirectory() as directory:
+        elapsed, latencies, errors = asyncio.run(
+            run(directory, size, requests, concurrency, workers, url)
+        )
+
+    rows = []
+    for name, values in latencies.items():
+        values.sort()
+        rows.append(
+            (
+                name,
+                len(values),
+                errors[name],
+                len(values) / elapsed,
+                percentile(values, 0.5) * 1e3,
+                percentile(values, 0.95) * 1e3,
+                percentile(values, 0.99) * 1e3,
+            )
+        )
+
+    print(
+        tabulate.tabulate(
+            rows,
+            headers=(
+                "Endpoint",
+                "Requests",
+                "Errors",
+                "Req/s",
+                "p50 [ms]",
+                "p95 [ms]",
+                "p99 [ms]",
+            ),
+            floatfmt=".2f",
+        )
+    )
+    print(f"{sum(map(len, latencies.values())) / elapsed:.0f} requests/s overall.")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,93 @@
+import os
+import sys
+import json
+import time
+import tempfile
+import statistics
+import subprocess
+
+import click
+import tabulate
+
+from generators import synthesize, writers
+
+
+HEAVY = ("piecash", "sqlalchemy", "lxml", "chardet", "tabulate", "ruamel.yaml")
+
+# Every scenario runs in a fresh interpreter and prints the heavy modules it
+# ended up importing as its last line.
+REPORT = "import sys, json; print(json.dumps([m for m in {!r} if m in sys.modules]))"
+
+SCENARIOS = {
+    "interpreter": "",
+    "import": "import webcash.utils.statements",
+    "help": (
+        "import io, contextlib\n"
+        "from webcash.utils.statements import cli\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        "    cli.main(['--help'], standalone_mode=False)"
+    ),
+    "parse:mBank": (
+        "from webcash.utils.statements import parser\n"
+        "list(parser['mBank']({statement!r}))"
+    ),
+}
+
+
+def measure(python, path, code):
+    start = time.perf_counter()
+    result = subprocess.run(
+        (python, "-c", code + "\n" + REPORT.format(HEAVY)),
+        env=dict(os.environ, PYTHONPATH=path),
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return time.perf_counter() - start, json.loads(result.stdout.splitlines()[-1])
+
+
+@click.command()
+@click.option("--repeat", default=20, show_default=True, help="Runs per scenario.")
+@click.option("--size", default=100, show_default=True, help="Statement rows.")
+@click.option(
+    "--path",
+    default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"),
+    show_default="../src",
+    help="Sources to measure, e.g. a worktree of an older revision.",
+)
+@click.option("--python", default=sys.executable, help="Interpreter to run.")
+def benchmark(repeat, size, path, python):
+    """Cold start of the statements CLI, each run in a new interpreter."""
+    with tempfile.TemporaryDirectory() as directory:
+        statement = os.path.join(directory, "mBank.csv")
+        writers["mBank"][0](statement, synthesize(size))
+
+        rows = []
+        for name, code in SCENARIOS.items():
+            code = code.format(statement=statement)
+            # The first run warms the file system cache and writes bytecode.
+            measure(python, path, code)
+            timings, modules = [], None
+            for _ in range(repeat):
+                seconds, modules = measure(python, path, code)
+                timings.append(seconds)
+            rows.append(
+                (
+                    name,
+                    min(timings) * 1e3,
+                    statistics.median(timings) * 1e3,
+                    ", ".join(modules) or "-",
+                )
+            )
+
+    print(
+        tabulate.tabulate(
+            rows,
+            headers=("Scenario", "Min [ms]", "Median [ms]", "Heavy modules"),
+            floatfmt=".1f",
+        )
+    )
+
+
+if __name__ == "__main__":
+    benchmark()
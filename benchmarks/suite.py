@@ -0,0 +1,221 @@
+import io
+import os
+import json
+import time
+import shutil
+import platform
+import tempfile
+import warnings
+import subprocess
+
+from contextlib import redirect_stdout
+
+import click
+import tabulate
+
+from generators import build_book, synthesize, write_configuration, writers
+
+from webcash.utils.gnucash import GnuCash
+from webcash.utils.reconciliation import Reconciliation
+from webcash.utils.statements import cli, parser
+
+
+def measure(function, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function()
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def revision():
+    try:
+        return subprocess.run(
+            ("git", "rev-parse", "--short", "HEAD"),
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def query(uri, from_date, to_date):
+    gnucash = GnuCash(uri)
+    return list(
+        gnucash.transactions(
+            *gnucash.accounts("Assets:Bank:*"), from_date=from_date, to_date=to_date
+        )
+    )
+
+
+def update(fn, records, dry_run):
+    gnucash = GnuCash(f"sqlite:///{fn}", read_only=False)
+    gnucash.insert(
+        (
+            record,
+            f"Assets:Bank:{record.currency}",
+            f"Expenses:Unknown:{record.currency}",
+        )
+        for record in records
+    )
+    if dry_run:
+        gnucash.book.session.rollback()
+    else:
+        gnucash.book.save()
+    gnucash.book.close()
+
+
+def run(directory, size, formats, encoding, repeat):
+    results = {}
+
+    def stage(name, function, rows=None):
+        seconds, result = measure(function, repeat)
+        rows = len(result) if rows is None else rows
+        results[name] = {
+            "seconds": seconds,
+            "rows": rows,
+            "rows_per_second": rows / seconds if seconds else None,
+        }
+        return result
+
+    statement = synthesize(size)
+
+    for name in formats:
+        writer, extension = writers[name]
+        fn = os.path.join(directory, f"{name}.{extension}")
+        if encoding:
+            writer(fn, statement, encoding=encoding)
+        else:
+            writer(fn, statement)
+        stage(f"parse:{name}", lambda: list(parser[name](fn)))
+
+    book = os.path.join(directory, "book.gnucash")
+    build_book(book, statement)
+
+    reconciliation = Reconciliation(statement)
+    from_date, to_date = reconciliation.window
+
+    splits = stage("query", lambda: query(f"sqlite:///{book}", from_date, to_date))
+
+    messages = stage(
+        "reconcile",
+        lambda: list(Reconciliation(statement).reconcile(splits)),
+        rows=len(statement) + len(splits),
+    )
+    exports = [record for record, status in messages if status == "EXPORT"]
+
+    copy = os.path.join(directory, "update.gnucash")
+
+    def write(dry_run):
+        shutil.copyfile(book, copy)
+        update(copy, exports, dry_run)
+        return exports
+
+    stage("update:dry-run", lambda: write(dry_run=True))
+    stage("update", lambda: write(dry_run=False))
+
+    configuration = os.path.join(directory, "configuration.yaml")
+    write_configuration(configuration, book)
+    mbank = os.path.join(directory, "mBank.csv")
+    if not os.path.exists(mbank):
+        writers["mBank"][0](mbank, statement)
+
+    def statements():
+        with redirect_stdout(io.StringIO()):
+            cli.main(["-c", configuration, "--no-cache", mbank], standalone_mode=False)
+        return statement
+
+    stage("cli", statements)
+
+    return results
+
+
+@click.command()
+@click.option("--size", default=10000, show_default=True, help="Statement rows.")
+@click.option(
+    "--formats",
+    default=",".join(writers),
+    show_default=True,
+    help="Comma separated statement formats to parse.",
+)
+@click.option(
+    "--encoding", help="Encoding of generated statements (format default if unset)."
+)
+@click.option("--repeat", default=3, show_default=True, help="Runs per stage.")
+@click.option(
+    "--directory",
+    type=click.Path(file_okay=False),
+    help="Keep generated files in this directory.",
+)
+@click.option(
+    "--output", "-o", type=click.Path(dir_okay=False), help="Write results as JSON."
+)
+@click.option(
+    "--baseline",
+    "-b",
+    type=click.File(encoding="utf-8"),
+    help="Compare against results of a previous run.",
+)
+def benchmark(size, formats, encoding, repeat, directory, output, baseline):
+    warnings.simplefilter("ignore")
+
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+        stages = run(directory, size, formats.split(","), encoding, repeat)
+    else:
+        with tempfile.TemporaryDirectory() as directory:
+            stages = run(directory, size, formats.split(","), encoding, repeat)
+
+    results = {
+        "revision": revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "size": size,
+        "stages": stages,
+    }
+
+    previous = json.load(baseline)["stages"] if baseline else {}
+
+    print(
+        tabulate.tabulate(
+            [
+                (
+                    name,
+                    stage["rows"],
+                    stage["seconds"] * 1e3,
+                    stage["rows_per_second"],
+                    *(
+                        (
+                            previous[name]["seconds"] * 1e3,
+                            stage["seconds"] / previous[name]["seconds"],
+                        )
+                        if name in previous
+                        else (None, None)
+                    ),
+                )
+                for name, stage in stages.items()
+            ],
+            headers=(
+                "Stage",
+                "Rows",
+                "Time [ms]",
+                "Rows/s",
+                "Baseline [ms]",
+                "Ratio",
+            ),
+            floatfmt=".2f",
+            missingval="-",
+        )
+    )
+
+    if output:
+        with open(output, "w", encoding="utf-8") as outfile:
+            json.dump(results, outfile, indent=2)
+
+
+if __name__ == "__main__":
+    benchmark()
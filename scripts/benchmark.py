@@ -0,0 +1,206 @@
+import io
+import os
+import time
+import asyncio
+import argparse
+import tempfile
+import tracemalloc
+from contextlib import redirect_stdout
+from datetime import datetime, timedelta, timezone
+
+import tabulate
+
+from bitbay import BitBay, Subscriptions
+from ledger import Ledger
+from zondamock import Zonda, generate_history, serve
+
+import cryptostats
+
+
+# Runs the BitBay client and cryptostats against zondamock in the same event
+# loop, so the figures include the cost of the mock server as well.
+
+KEY, SECRET = 'benchmark-key', 'benchmark-secret'
+
+
+async def measure(name, function):
+    tracemalloc.start()
+    start = time.perf_counter()
+    count, unit = await function()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return name, count, unit, elapsed * 1e3, count / elapsed, peak / 1024
+
+
+async def run(arguments):
+    zonda = Zonda(
+        KEY, SECRET, history=arguments.history, page=arguments.page, latency=arguments.latency,
+        messages=arguments.messages
+    )
+    runner, rest_url, websocket_url = await serve(zonda)
+    options = {
+        'rest_url': rest_url,
+        'websocket_url': websocket_url,
+        'connections': arguments.concurrency,
+        # The mock does not limit requests.
+        'rate': 10 ** 9,
+    }
+
+    async def tickers():
+        async with BitBay(KEY, SECRET, **options) as api:
+            semaphore = asyncio.Semaphore(arguments.concurrency)
+
+            async def request():
+                async with semaphore:
+                    await api.rest('GET', 'trading/ticker')
+
+            await asyncio.gather(*(request() for _ in range(arguments.requests)))
+        return arguments.requests, 'requests'
+
+    async def pages():
+        async with BitBay(KEY, SECRET, **options) as api:
+            count = 0
+            async for _ in api.pages('POST', 'trading/history/transactions'):
+                count += 1
+        return count, 'trades'
+
+    async def windows():
+        async with BitBay(KEY, SECRET, **options) as api:
+            count = 0
+            async for _ in api.windows(
+                'POST', 'trading/history/transactions', datetime.now() - timedelta(days=6 * 365), datetime.now(),
+                timedelta(days=90), concurrency=arguments.concurrency, key=lambda item: int(item['time'])
+            ):
+                count += 1
+        return count, 'trades'
+
+    async def websocket():
+        markets = [f'M{index}-PLN' for index in range(arguments.topics)]
+        async with BitBay(KEY, SECRET, **options) as api:
+            async with Subscriptions(api, size=arguments.messages) as manager:
+                subscriptions = [await manager.subscribe(f'trading/ticker/{market}') for market in markets]
+
+                async def consume(subscription):
+                    count = 0
+                    async for _ in subscription:
+                        count += 1
+                        if count == arguments.messages:
+                            break
+                    return count
+
+                counts = await asyncio.gather(*map(consume, subscriptions))
+        return sum(counts), 'messages'
+
+    async def get_stats():
+        with redirect_stdout(io.StringIO()):
+            await cryptostats.get_stats(**options)
+        return zonda.requests - requests, 'requests'
+
+    results = []
+    try:
+        for name, function in (('rest:ticker', tickers), ('rest:pages', pages), ('rest:windows', windows),
+                               ('websocket', websocket)):
+            results.append(await measure(name, function))
+
+        with tempfile.TemporaryDirectory() as directory:
+            os.environ.update({
+                'BITBAY_API_KEY': KEY,
+                'BITBAY_SECRET': SECRET,
+                'CRYPTOSTATS_STORE': os.path.join(directory, 'trades.sqlite'),
+            })
+            # The first run syncs the whole history, the second only checks
+            # for new trades.
+            for name in ('get_stats:cold', 'get_stats:warm'):
+                requests = zonda.requests
+                results.append(await measure(name, get_stats))
+    finally:
+        await runner.cleanup()
+
+    if zonda.rejected:
+        raise RuntimeError(f'{zonda.rejected} requests had invalid signatures.')
+    return results
+
+
+def replay(trades, period):
+    # What get_stats does per trade, plus a snapshot per currency and period.
+    ledger, table = Ledger(), {}
+    for transaction in trades:
+        ledger.apply(transaction)
+        currency = transaction['market'].split('-', maxsplit=1)[0]
+        day = datetime.fromtimestamp(int(transaction['time']) / 1000, timezone.utc).date()
+        position = ledger.positions[currency]
+        table[currency, day if period == 'day' else day.replace(day=1)] = (
+            position.amount, position.cost, position.profit
+        )
+    return ledger, table
+
+
+def compare(arguments):
+    # NumPy is only needed here.
+    import analytics
+
+    trades = generate_history(arguments.history, ['BTC-PLN', 'ETH-PLN', 'LTC-PLN', 'XRP-PLN', 'SOL-PLN'])
+    trades.reverse()
+    rows = [
+        (int(trade['time']), trade['market'], trade['userAction'], trade['amount'], trade['rate'],
+         trade['commissionValue'])
+        for trade in trades
+    ]
+
+    results = []
+    for name, function in (
+        ('loop', lambda: replay(trades, arguments.period)),
+        ('vectorized', lambda: analytics.buckets(analytics.load(rows), arguments.period)),
+    ):
+        start = time.perf_counter()
+        result = function()
+        elapsed = time.perf_counter() - start
+        # Tracing allocations slows the loop down far more, so it gets a run
+        # of its own.
+        tracemalloc.start()
+        function()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        results.append((name, len(trades), 'trades', elapsed * 1e3, len(trades) / elapsed, peak / 1024))
+        if name == 'loop':
+            _, table = result
+        else:
+            buckets = result
+
+    # Holdings are exact, costs and profits differ by float rounding.
+    error = 0.0
+    for index in range(len(buckets['market'])):
+        currency = buckets['names'][buckets['market'][index]]
+        day = buckets['bucket'][index].astype('datetime64[D]').item()
+        amount, cost, profit = table[currency, day]
+        assert int(amount * analytics.SCALE) == buckets['holdings'][index]
+        error = max(
+            error,
+            abs(float(cost) - buckets['cost'][index]) / max(abs(float(cost)), 1.0),
+            abs(float(profit) - buckets['realized'][index]) / max(abs(float(profit)), 1.0),
+        )
+    print(f'{len(buckets["market"])} {arguments.period} buckets, largest relative difference {error:.2e}.')
+    assert error <= analytics.TOLERANCE, f'Analytics differ from Ledger by more than {analytics.TOLERANCE}.'
+    return results
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Throughput of the BitBay client against zondamock.')
+    parser.add_argument('--history', type=int, default=10000, help='Trades in the account history.')
+    parser.add_argument('--page', type=int, default=100, help='Trades per history page.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every REST request.')
+    parser.add_argument('--requests', type=int, default=1000, help='Ticker requests.')
+    parser.add_argument('--concurrency', type=int, default=8, help='Concurrent requests and windows.')
+    parser.add_argument('--topics', type=int, default=10, help='Websocket subscriptions.')
+    parser.add_argument('--messages', type=int, default=1000, help='Messages per subscription.')
+    parser.add_argument('--analytics', action='store_true', help='Compare the analytics of --history trades instead.')
+    parser.add_argument('--period', choices=('day', 'month'), default='month', help='Analytics period.')
+    arguments = parser.parse_args()
+
+    print(tabulate.tabulate(
+        compare(arguments) if arguments.analytics else asyncio.run(run(arguments)),
+        headers=('Scenario', 'Count', 'Unit', 'Time [ms]', 'Per second', 'Peak [KiB]'),
+        floatfmt='.1f'
+    ))
@@ -1,6 +1,11 @@
+import os
 import uuid
 import hmac
 import json
+import time
+import random
+import asyncio
+from collections import defaultdict, deque
 from datetime import datetime, timedelta
 
 import aiohttp
@@ -54,17 +59,80 @@ import websockets
 # PRIVATE SUBSCRIBE cantor_service/exchanges/status
 
 
+REST_URL = os.environ.get('BITBAY_REST_URL', 'https://api.zonda.exchange/rest/')
+WEBSOCKET_URL = os.environ.get('BITBAY_WEBSOCKET_URL', 'wss://api.zonda.exchange/websocket/')
+
+
+class RateLimiter:
+
+    # Zonda counts requests per key and answers 429 once over the limit, the
+    # defaults keep to one request per second on average.
+
+    def __init__(self, rate=60, period=60.0):
+        self.rate = rate
+        self.period = period
+        self.calls = deque()
+        self.resume = 0.0
+        self.lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self.lock:
+            while True:
+                now = time.monotonic()
+                while self.calls and self.calls[0] <= now - self.period:
+                    self.calls.popleft()
+                if now >= self.resume and len(self.calls) < self.rate:
+                    self.calls.append(now)
+                    return
+                wait = self.resume - now
+                if len(self.calls) >= self.rate:
+                    wait = max(wait, self.calls[0] + self.period - now)
+                await asyncio.sleep(wait)
+
+    def hold(self, seconds):
+        # Every request waits after a rejection, not only the rejected one.
+        self.resume = max(self.resume, time.monotonic() + seconds)
+
+
+class RetryError(Exception):
+
+    def __init__(self, status, retry_after=None):
+        super().__init__(status)
+        self.status = status
+        self.retry_after = int(retry_after) if retry_after and retry_after.isdigit() else None
+
+
+def milliseconds(value):
+    if isinstance(value, datetime):
+        return int(value.timestamp() * 1000)
+    if isinstance(value, timedelta):
+        return int(value.total_seconds() * 1000)
+    return value
+
+
 class BitBay:
 
-    def __init__(self, key, secret):
+    def __init__(self, key, secret, connections=8, rate=60, period=60.0, retries=5, backoff=1.0,
+                 rest_url=REST_URL, websocket_url=WEBSOCKET_URL):
         self.__key = key
         self.__secret = secret
-        self.__session = aiohttp.ClientSession()
+        self.rest_url = rest_url
+        self.websocket_url = websocket_url
+        self.__session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=connections))
+        self.__ws = None
+        self.limiter = RateLimiter(rate, period)
+        self.retries = retries
+        self.backoff = backoff
 
     async def __aenter__(self):
-        self.__ws = await websockets.connect('wss://api.zonda.exchange/websocket/')
+        await self.connect()
         return self
 
+    async def connect(self):
+        if self.__ws is not None:
+            await self.__ws.close()
+        self.__ws = await websockets.connect(self.websocket_url)
+
     async def __aexit__(self, *args):
         await self.close()
 
@@ -106,42 +174,231 @@ class BitBay:
             'operation-id': str(uuid.uuid4())
         }
 
-    async def rest(self, method, endpoint, query=None, paginated=False):
+    async def request(self, method, endpoint, query=None):
         query = query or {}
-        items = []
 
         kwargs = {
             'method': method,
-            'url': f'https://api.zonda.exchange/rest/{endpoint}'
+            'url': f'{self.rest_url}{endpoint}'
         }
 
-        if paginated:
-            query['nextPageCursor'] = 'start'
-
         if method in ['POST', 'PUT']:
             kwargs['json'] = query
         else:
             kwargs['params'] = json.dumps(query)
 
+        for attempt in range(self.retries + 1):
+            await self.limiter.acquire()
+            try:
+                # Headers are signed again, every attempt needs a new operation-id.
+                async with self.__session.request(headers=self.auth_headers(query), **kwargs) as response:
+                    if response.status == 429 or response.status >= 500:
+                        raise RetryError(response.status, response.headers.get('Retry-After'))
+                    payload = await response.json()
+            except (RetryError, aiohttp.ClientConnectionError, asyncio.TimeoutError) as error:
+                if attempt == self.retries:
+                    raise
+                delay = self.backoff * 2 ** attempt * random.uniform(0.5, 1.5)
+                if isinstance(error, RetryError) and error.status == 429:
+                    delay = max(delay, error.retry_after or 0)
+                    self.limiter.hold(delay)
+                await asyncio.sleep(delay)
+                continue
+
+            if payload.get('status') == 'Ok':
+                return payload
+            raise ValueError(payload.pop('errors', ['UNKNOWN_ERROR']))
+
+    async def pages(self, method, endpoint, query=None):
+        # Yields the items of every page as soon as it arrives.
+        query = dict(query or {}, nextPageCursor='start')
+
         while True:
-            async with self.__session.request(headers=self.auth_headers(query), **kwargs) as response:
-                payload = await response.json()
-                if payload.get('status') == 'Ok':
-                    if not paginated:
-                        return payload
-                    items.extend(payload['items'])
-                    if query.get('nextPageCursor') == payload.get('nextPageCursor'):
-                        break
-                    query['nextPageCursor'] = payload['nextPageCursor']
-                else:
-                    raise ValueError(payload.pop('errors', ['UNKNOWN_ERROR']))
-        return items
+            payload = await self.request(method, endpoint, query)
+            for item in payload['items']:
+                yield item
+            if query.get('nextPageCursor') == payload.get('nextPageCursor'):
+                break
+            query['nextPageCursor'] = payload['nextPageCursor']
 
+    async def windows(self, method, endpoint, start, end, step, query=None, concurrency=4, key=None):
+        # Splits [start, end) into fromTime/toTime windows, each paginated on
+        # its own, and fetches up to concurrency of them at once. Windows are
+        # yielded oldest first, their items sorted by key if given.
+        start, end, step = map(milliseconds, (start, end, step))
+        bounds = [(left, min(left + step, end) - 1) for left in range(start, end, step)]
 
-if __name__ == '__main__':
+        async def fetch(left, right):
+            items = [item async for item in self.pages(method, endpoint, dict(query or {}, fromTime=left, toTime=right))]
+            return sorted(items, key=key) if key else items
+
+        pending = deque()
+        try:
+            for bound in bounds:
+                pending.append(asyncio.ensure_future(fetch(*bound)))
+                if len(pending) >= concurrency:
+                    for item in await pending.popleft():
+                        yield item
+            while pending:
+                for item in await pending.popleft():
+                    yield item
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def rest(self, method, endpoint, query=None, paginated=False):
+        if paginated:
+            return [item async for item in self.pages(method, endpoint, query)]
+        return await self.request(method, endpoint, query)
+
+
+class TopicStatistics:
+
+    __slots__ = ('subscribers', 'received', 'delivered', 'dropped', 'peak')
+
+    def __init__(self):
+        self.subscribers = 0
+        self.received = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.peak = 0
+
+    def __repr__(self):
+        return ' '.join(f'{name}={getattr(self, name)}' for name in self.__slots__)
+
+
+class Subscription:
+
+    def __init__(self, manager, topic, size):
+        self.manager = manager
+        self.topic = topic
+        self.queue = asyncio.Queue(size)
+        self.closed = False
 
-    import os
-    import asyncio
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        message = await self.queue.get()
+        if message is None:
+            raise StopAsyncIteration
+        return message
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def end(self):
+        # Wakes up a consumer waiting in `async for`, the sentinel replaces the
+        # oldest message if the queue is full.
+        self.closed = True
+        if self.queue.full():
+            self.queue.get_nowait()
+        self.queue.put_nowait(None)
+
+    async def close(self):
+        if not self.closed:
+            self.end()
+            await self.manager.unsubscribe(self)
+
+
+class Subscriptions:
+
+    # A single task reads the websocket and fans messages out to bounded
+    # queues. A full queue loses its oldest message instead of blocking the
+    # reader, so one slow consumer does not hold back the other topics.
+
+    def __init__(self, api, size=100, delay=1.0, max_delay=30.0):
+        self.api = api
+        self.size = size
+        self.delay = delay
+        self.max_delay = max_delay
+        self.topics = {}
+        self.subscribers = defaultdict(set)
+        self.statistics = defaultdict(TopicStatistics)
+        self.reconnects = 0
+        self.reader = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    async def subscribe(self, endpoint, private=False, query=None, size=None):
+        topic = endpoint.lower()
+        subscription = Subscription(self, topic, size or self.size)
+        if not self.subscribers[topic]:
+            self.topics[topic] = 'subscribe-private' if private else 'subscribe-public', query
+            await self.api.send(self.topics[topic][0], topic, query)
+        self.subscribers[topic].add(subscription)
+        self.statistics[topic].subscribers = len(self.subscribers[topic])
+        if self.reader is None:
+            self.reader = asyncio.ensure_future(self.run())
+        return subscription
+
+    async def unsubscribe(self, subscription):
+        subscribers = self.subscribers[subscription.topic]
+        subscribers.discard(subscription)
+        self.statistics[subscription.topic].subscribers = len(subscribers)
+        if not subscribers and self.topics.pop(subscription.topic, None):
+            await self.api.send('unsubscribe', subscription.topic)
+
+    async def run(self):
+        delay = self.delay
+        while True:
+            try:
+                message = json.loads(await self.api.recv())
+                delay = self.delay
+            except (websockets.ConnectionClosed, OSError):
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.max_delay)
+                try:
+                    await self.resubscribe()
+                except (websockets.WebSocketException, OSError):
+                    pass
+                continue
+            self.route(message)
+
+    async def resubscribe(self):
+        await self.api.connect()
+        self.reconnects += 1
+        for topic, (action, query) in self.topics.items():
+            await self.api.send(action, topic, query)
+
+    def route(self, message):
+        # Confirmations and pongs carry no topic.
+        topic = message.get('topic', '').lower()
+        if topic not in self.topics:
+            return
+        statistics = self.statistics[topic]
+        statistics.received += 1
+        for subscription in self.subscribers[topic]:
+            if subscription.queue.full():
+                subscription.queue.get_nowait()
+                statistics.dropped += 1
+            subscription.queue.put_nowait(message)
+            statistics.delivered += 1
+            statistics.peak = max(statistics.peak, subscription.queue.qsize())
+
+    async def close(self):
+        if self.reader is not None:
+            self.reader.cancel()
+            try:
+                await self.reader
+            except asyncio.CancelledError:
+                pass
+            self.reader = None
+        for subscribers in self.subscribers.values():
+            for subscription in subscribers:
+                subscription.end()
+        self.subscribers.clear()
+        self.topics.clear()
+
+
+if __name__ == '__main__':
 
     async def example():
         async with BitBay(os.environ.get('BITBAY_API_KEY'), os.environ.get('BITBAY_SECRET')) as api:
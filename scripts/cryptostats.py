@@ -1,18 +1,27 @@
 import os
 import asyncio
+import argparse
 
-from types import SimpleNamespace
 from decimal import Decimal
-from datetime import datetime
+from datetime import datetime, timedelta
 
 from bitbay import BitBay
+from tradestore import TradeStore
 
 
-async def get_stats():
+# History is fetched in yearly windows, a few of them at a time. Only trades
+# newer than those in the store are requested.
+SINCE = datetime(2014, 1, 1)
+WINDOW = timedelta(days=365)
 
-    async with BitBay(os.environ.get('BITBAY_API_KEY'), os.environ.get('BITBAY_SECRET')) as api:
 
-        wallet = {}
+async def get_stats(period=None, **options):
+
+    store = TradeStore(os.environ.get('CRYPTOSTATS_STORE'))
+    ledger = store.snapshot()
+    since = store.last_time()
+
+    async with BitBay(os.environ.get('BITBAY_API_KEY'), os.environ.get('BITBAY_SECRET'), **options) as api:
 
         ticker = {
             market.split('-')[0]: {
@@ -23,55 +32,45 @@ async def get_stats():
             if market.endswith('-PLN')
         }
 
-        for transaction in reversed(await api.rest('POST', 'trading/history/transactions', paginated=True)):
-            target_currency, source_currency = transaction['market'].split('-', maxsplit=1)
-            commission = Decimal(transaction['commissionValue'])
-            amount = Decimal(transaction['amount'])
-            time = datetime.fromtimestamp(int(transaction['time'])/1000).strftime('%Y.%m.%d %H:%M:%S')
-            rate = Decimal(transaction['rate'])
-
-            wallet.setdefault(target_currency, {
-                'amount': 0, 'cost': 0, 'profit': 0, 'commission': 0, 'history': []
-            })
-
-            if transaction['userAction'] == 'Buy':
-                wallet[target_currency]['amount'] += amount - commission
-                wallet[target_currency]['cost'] += amount * rate
-                wallet[target_currency]['commission'] += commission * rate
-
-                wallet[target_currency]['history'].append([
-                    time, 'BUY',
-                    amount, target_currency,
-                    amount * rate, source_currency,
-                    rate, wallet[target_currency]['cost'] / wallet[target_currency]['amount']
-                ])
-
-            if transaction['userAction'] == 'Sell':
-                average_cost = wallet[target_currency]['cost'] / wallet[target_currency]['amount']
-                wallet[target_currency]['profit'] += amount * (rate - average_cost) - commission
-                wallet[target_currency]['amount'] -= amount
-                wallet[target_currency]['cost'] = wallet[target_currency]['amount'] * average_cost
-                wallet[target_currency]['commission'] += commission
-
-                wallet[target_currency]['history'].append([
-                    time, 'SELL',
-                    amount, target_currency,
-                    amount*rate, source_currency,
-                    rate, average_cost
-                ])
-
-        for currency in sorted(wallet):
-
-            w = SimpleNamespace(**wallet[currency])
-
-            print(
-                f'{w.amount:{ticker[currency]["format"]}} {currency:4} = '
-                f'{w.cost:8.2f}{(ticker[currency]["rate"]*w.amount-w.cost):+9.2f} PLN '
-                f'({(ticker[currency]["rate"]-w.cost/w.amount)*w.amount/w.cost*100 if w.amount else 0:+7.2f} %) '
-                f'\N{GREEK CAPITAL LETTER SIGMA} = {w.profit:8.2f} PLN ({w.commission:8.2f} PLN)'
+        # Trades sharing the time of the last synced one are skipped by id.
+        transactions = [
+            transaction async for transaction in api.windows(
+                'POST', 'trading/history/transactions', SINCE if since is None else since, datetime.now(), WINDOW,
+                key=lambda item: int(item['time'])
             )
+        ]
+
+    store.update(ledger, transactions)
+    columns = store.columns() if period else None
+    store.close()
+
+    for currency in sorted(ledger.positions):
+
+        w = ledger.positions[currency]
+
+        print(
+            f'{w.amount:{ticker[currency]["format"]}} {currency:4} = '
+            f'{w.cost:8.2f}{(ticker[currency]["rate"]*w.amount-w.cost):+9.2f} PLN '
+            f'({(ticker[currency]["rate"]-w.cost/w.amount)*w.amount/w.cost*100 if w.amount else 0:+7.2f} %) '
+            f'\N{GREEK CAPITAL LETTER SIGMA} = {w.profit:8.2f} PLN ({w.commission:8.2f} PLN)'
+        )
+
+
+    if period:
+        # NumPy is only needed for the breakdown.
+        import analytics
+        import tabulate
+
+        print()
+        print(tabulate.tabulate(
+            analytics.rows(analytics.buckets(analytics.load(columns), period)),
+            headers=analytics.HEADERS, floatfmt='.2f'
+        ))
 
 
 if __name__ == '__main__':
 
-    asyncio.run(get_stats())
+    parser = argparse.ArgumentParser(description='Holdings and profits of a Zonda account.')
+    parser.add_argument('--period', choices=('day', 'month'), help='Also break trades down per market and period.')
+
+    asyncio.run(get_stats(parser.parse_args().period))
@@ -0,0 +1,55 @@
+from decimal import Decimal
+
+
+class Position:
+
+    __slots__ = ('amount', 'cost', 'profit', 'commission')
+
+    def __init__(self, amount=0, cost=0, profit=0, commission=0):
+        self.amount = Decimal(amount)
+        self.cost = Decimal(cost)
+        self.profit = Decimal(profit)
+        self.commission = Decimal(commission)
+
+    def buy(self, amount, rate, commission):
+        # Buy commissions are charged in the bought currency.
+        self.amount += amount - commission
+        self.cost += amount * rate
+        self.commission += commission * rate
+
+    def sell(self, amount, rate, commission):
+        average_cost = self.cost / self.amount
+        self.profit += amount * (rate - average_cost) - commission
+        self.amount -= amount
+        self.cost = self.amount * average_cost
+        self.commission += commission
+
+    def to_dict(self):
+        return {name: str(getattr(self, name)) for name in self.__slots__}
+
+
+class Ledger:
+    """Average cost basis of every currency traded, updated trade by trade."""
+
+    def __init__(self, positions=None):
+        self.positions = positions or {}
+
+    def apply(self, transaction):
+        target_currency, _ = transaction['market'].split('-', maxsplit=1)
+        position = self.positions.setdefault(target_currency, Position())
+
+        amount = Decimal(transaction['amount'])
+        rate = Decimal(transaction['rate'])
+        commission = Decimal(transaction['commissionValue'])
+
+        if transaction['userAction'] == 'Buy':
+            position.buy(amount, rate, commission)
+        elif transaction['userAction'] == 'Sell':
+            position.sell(amount, rate, commission)
+
+    def to_dict(self):
+        return {currency: position.to_dict() for currency, position in self.positions.items()}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls({currency: Position(**position) for currency, position in data.items()})
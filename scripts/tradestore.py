@@ -0,0 +1,80 @@
+import os
+import json
+import sqlite3
+
+from ledger import Ledger
+
+
+def default_path():
+    return os.path.join(
+        os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache')),
+        'webcash',
+        'trades.sqlite'
+    )
+
+
+class TradeStore:
+    """Trades synced so far and the ledger snapshot taken after the last of them."""
+
+    def __init__(self, path=None):
+        self.path = path or default_path()
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self.connection = sqlite3.connect(self.path, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS trades ('
+            ' id TEXT PRIMARY KEY,'
+            ' time INTEGER NOT NULL,'
+            ' trade TEXT NOT NULL)'
+        )
+        self.connection.execute('CREATE INDEX IF NOT EXISTS trades_time ON trades (time)')
+        self.connection.execute(
+            'CREATE TABLE IF NOT EXISTS snapshot ('
+            ' id INTEGER PRIMARY KEY CHECK (id = 0),'
+            ' time INTEGER NOT NULL,'
+            ' ledger TEXT NOT NULL)'
+        )
+
+    def close(self):
+        self.connection.close()
+
+    def last_time(self):
+        return self.connection.execute('SELECT max(time) FROM trades').fetchone()[0]
+
+    def snapshot(self):
+        row = self.connection.execute('SELECT ledger FROM snapshot').fetchone()
+        return Ledger.from_dict(json.loads(row[0])) if row else Ledger()
+
+    def update(self, ledger, transactions):
+        # Trades already stored are skipped, so windows may overlap the last
+        # synced time. The ledger is saved in the same database transaction
+        # as the trades it includes.
+        added = 0
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            for transaction in transactions:
+                cursor = self.connection.execute(
+                    'INSERT OR IGNORE INTO trades (id, time, trade) VALUES (?, ?, ?)',
+                    (transaction['id'], int(transaction['time']), json.dumps(transaction))
+                )
+                if cursor.rowcount:
+                    ledger.apply(transaction)
+                    added += 1
+            self.connection.execute(
+                'INSERT OR REPLACE INTO snapshot (id, time, ledger) VALUES (0, ?, ?)',
+                (self.last_time() or 0, json.dumps(ledger.to_dict()))
+            )
+            self.connection.execute('COMMIT')
+        except BaseException:
+            self.connection.execute('ROLLBACK')
+            raise
+        return added
+
+    def columns(self):
+        # The fields analytics.load expects, in the order trades happened.
+        return self.connection.execute(
+            "SELECT time, json_extract(trade, '$.market'), json_extract(trade, '$.userAction'),"
+            " json_extract(trade, '$.amount'), json_extract(trade, '$.rate'),"
+            " json_extract(trade, '$.commissionValue')"
+            ' FROM trades ORDER BY time, rowid'
+        ).fetchall()
@@ -0,0 +1,225 @@
+import hmac
+import json
+import random
+import asyncio
+import argparse
+from urllib.parse import unquote
+from datetime import datetime, timedelta
+
+from aiohttp import web, WSMsgType
+
+
+# Answers the subset of the Zonda API used by bitbay.py and cryptostats.py:
+#
+# GET rest/trading/ticker
+# GET rest/trading/ticker/{trading_pair}
+# POST rest/trading/history/transactions (fromTime, toTime, nextPageCursor)
+# SUBSCRIBE trading/ticker/{trading_pair}
+
+
+class Rejected(Exception):
+    pass
+
+
+@web.middleware
+async def failures(request, handler):
+    # Zonda reports errors in the payload, not with the HTTP status.
+    try:
+        return await handler(request)
+    except Rejected as error:
+        return web.json_response({'status': 'Fail', 'errors': [str(error)]})
+
+
+def signature(secret, message):
+    return hmac.digest(secret.encode('ascii'), message.encode('utf-8'), 'sha512').hex()
+
+
+def generate_history(size, markets, seed=0):
+    # Trades are spread evenly over the last few years, newest first like the
+    # real endpoint returns them.
+    rng = random.Random(seed)
+    end = int(datetime.now().timestamp() * 1000)
+    step = int(timedelta(days=5 * 365).total_seconds() * 1000) // max(size, 1)
+    holdings = {market: 0 for market in markets}
+    history = []
+    for index in range(size):
+        market = rng.choice(markets)
+        # Sells never exceed what was bought, so the replayed costs stay sane.
+        action = 'Buy' if holdings[market] < 0.01 or rng.random() < 0.5 else 'Sell'
+        if action == 'Buy':
+            amount = rng.randint(1, 10000) / 10000
+            holdings[market] += amount - amount / 1000
+        else:
+            amount = round(holdings[market] * rng.uniform(0.1, 0.9), 8)
+            holdings[market] -= amount
+        history.append({
+            'id': f'{index:08d}-{rng.getrandbits(32):08x}',
+            'market': market,
+            'time': str(end - (size - index) * step),
+            'amount': f'{amount:.8f}',
+            'rate': f'{rng.uniform(1000, 200000):.2f}',
+            'initializedBy': action,
+            'wasTaker': True,
+            'userAction': action,
+            'offerId': None,
+            'commissionValue': f'{amount / 1000:.8f}',
+        })
+    history.reverse()
+    return history
+
+
+def ticker_of(market, rng):
+    first, second = market.split('-')
+    return {
+        'market': {
+            'code': market,
+            'first': {'currency': first, 'minOffer': '0.00001', 'scale': 8},
+            'second': {'currency': second, 'minOffer': '5', 'scale': 2},
+        },
+        'time': str(int(datetime.now().timestamp() * 1000)),
+        'highestBid': f'{rng.uniform(1000, 200000):.2f}',
+        'lowestAsk': f'{rng.uniform(1000, 200000):.2f}',
+        'rate': f'{rng.uniform(1000, 200000):.2f}',
+        'previousRate': f'{rng.uniform(1000, 200000):.2f}',
+    }
+
+
+class Zonda:
+
+    def __init__(self, key='key', secret='secret', history=10000, page=100, markets=('BTC-PLN', 'ETH-PLN', 'LTC-PLN'),
+                 latency=0.0, interval=0.0, messages=1000):
+        self.key = key
+        self.secret = secret
+        self.page = page
+        self.markets = list(markets)
+        self.latency = latency
+        self.interval = interval
+        self.messages = messages
+        self.history = generate_history(history, self.markets)
+        self.rng = random.Random(1)
+        self.requests = 0
+        self.pushed = 0
+        self.rejected = 0
+
+    def app(self):
+        app = web.Application(middlewares=[failures])
+        app.add_routes([
+            web.get('/rest/trading/ticker', self.tickers),
+            web.get('/rest/trading/ticker/{market}', self.ticker),
+            web.post('/rest/trading/history/transactions', self.transactions),
+            web.get('/websocket/', self.websocket),
+        ])
+        return app
+
+    async def authorize(self, request):
+        self.requests += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        # The client signs the JSON it sends, as body or as the query string.
+        payload = await request.text() if request.method in ('POST', 'PUT') else unquote(request.query_string)
+        message = request.headers.get('API-Key', '') + request.headers.get('Request-Timestamp', '') + payload
+        if (request.headers.get('API-Key') != self.key
+                or not hmac.compare_digest(request.headers.get('API-Hash', ''), signature(self.secret, message))):
+            self.rejected += 1
+            raise Rejected('PERMISSIONS_NOT_SUFFICIENT')
+        return json.loads(payload) if payload else {}
+
+    async def tickers(self, request):
+        await self.authorize(request)
+        return web.json_response({
+            'status': 'Ok', 'items': {market: ticker_of(market, self.rng) for market in self.markets}
+        })
+
+    async def ticker(self, request):
+        await self.authorize(request)
+        market = request.match_info['market']
+        if market not in self.markets:
+            raise Rejected('TICKER_NOT_FOUND')
+        return web.json_response({'status': 'Ok', 'ticker': ticker_of(market, self.rng)})
+
+    async def transactions(self, request):
+        query = await self.authorize(request)
+        low, high = int(query.get('fromTime', 0)), int(query.get('toTime', 2 ** 63))
+        cursor = query.get('nextPageCursor', 'start')
+        offset = 0 if cursor == 'start' else int(cursor)
+        matching = [item for item in self.history if low <= int(item['time']) <= high]
+        items = matching[offset:offset + self.page]
+        # The last page repeats the cursor it was asked for.
+        following = str(offset + self.page) if offset + self.page < len(matching) else cursor
+        return web.json_response({
+            'status': 'Ok', 'totalRows': str(len(matching)), 'items': items, 'query': query,
+            'nextPageCursor': following
+        })
+
+    async def websocket(self, request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        streams = {}
+
+        async def stream(topic):
+            market = topic.rsplit('/', 1)[1].upper()
+            for sequence in range(self.messages):
+                if self.interval:
+                    await asyncio.sleep(self.interval)
+                elif sequence % 100 == 99:
+                    # Lets the other streams and the reader run in between.
+                    await asyncio.sleep(0)
+                if ws.closed:
+                    return
+                await ws.send_str(json.dumps({
+                    'action': 'push', 'topic': topic, 'message': ticker_of(market, self.rng),
+                    'timestamp': int(datetime.now().timestamp() * 1000), 'seqNo': sequence
+                }))
+                self.pushed += 1
+
+        try:
+            async for message in ws:
+                if message.type != WSMsgType.TEXT:
+                    continue
+                command = json.loads(message.data)
+                topic = f"{command.get('module')}/{command.get('path')}".lower()
+                if command['action'] == 'ping':
+                    await ws.send_str(json.dumps({'action': 'pong'}))
+                elif command['action'] in ('subscribe-public', 'subscribe-private'):
+                    if command.get('hashSignature') != signature(
+                        self.secret, command.get('publicKey', '') + command.get('requestTimestamp', '')
+                    ):
+                        self.rejected += 1
+                        await ws.send_str(json.dumps({'action': 'error', 'error': 'PERMISSIONS_NOT_SUFFICIENT'}))
+                        continue
+                    await ws.send_str(json.dumps({'action': f"{command['action']}-confirm", 'module': command.get('module'), 'path': command.get('path')}))
+                    if topic not in streams:
+                        streams[topic] = asyncio.ensure_future(stream(topic))
+                elif command['action'] == 'unsubscribe' and topic in streams:
+                    streams.pop(topic).cancel()
+        finally:
+            for task in streams.values():
+                task.cancel()
+        return ws
+
+
+async def serve(zonda, host='127.0.0.1', port=0):
+    runner = web.AppRunner(zonda.app())
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    host, port = runner.addresses[0][:2]
+    return runner, f'http://{host}:{port}/rest/', f'ws://{host}:{port}/websocket/'
+
+
+if __name__ == '__main__':
+
+    parser = argparse.ArgumentParser(description='Local stand-in for the Zonda API.')
+    parser.add_argument('--port', type=int, default=8081)
+    parser.add_argument('--key', default='key')
+    parser.add_argument('--secret', default='secret')
+    parser.add_argument('--history', type=int, default=10000, help='Trades in the account history.')
+    parser.add_argument('--page', type=int, default=100, help='Trades per history page.')
+    parser.add_argument('--latency', type=float, default=0.0, help='Seconds added to every REST request.')
+    parser.add_argument('--interval', type=float, default=0.1, help='Seconds between websocket messages.')
+    parser.add_argument('--messages', type=int, default=1000, help='Messages per subscription.')
+    arguments = parser.parse_args()
+
+    web.run_app(Zonda(
+        arguments.key, arguments.secret, arguments.history, arguments.page, latency=arguments.latency,
+        interval=arguments.interval, messages=arguments.messages
+    ).app(), host='127.0.0.1', port=arguments.port)
@@ -0,0 +1,371 @@
+import os
+import asyncio
+import datetime
+import tempfile
+import threading
+
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
+
+import click
+
+from aiohttp import web
+from ruamel.yaml import YAML
+
+from webcash.utils.gnucash import GnuCash
+from webcash.utils.records import format_amount
+from webcash.utils.statements import (
+    collect_exports,
+    detector_of,
+    importers_of,
+    load_statement,
+    reconcile_statement,
+)
+
+
+routes = web.RouteTableDef()
+
+
+class LRUCache:
+    def __init__(self, size=256):
+        self.size = size
+        self.entries = OrderedDict()
+        self.generations = defaultdict(int)
+
+    def get(self, key):
+        if key not in self.entries:
+            return None
+        self.entries.move_to_end(key)
+        return self.entries[key]
+
+    def put(self, key, value, generation):
+        # Values computed before a write to the same book are dropped.
+        if generation != self.generations[key[0]]:
+            return
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.size:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, book):
+        self.generations[book] += 1
+        for key in [key for key in self.entries if key[0] == book]:
+            del self.entries[key]
+
+
+class Books:
+    # SQLAlchemy sessions are not thread safe, so every worker thread keeps its
+    # own GnuCash per book and reuses it across requests.
+
+    def __init__(self, uris, workers=4, writable=False):
+        self.uris = uris
+        self.workers = workers
+        self.writable = writable
+        self.executor = ThreadPoolExecutor(workers, thread_name_prefix="webcash")
+        self.local = threading.local()
+        self.write_locks = {name: threading.Lock() for name in uris}
+
+    def connection(self, name):
+        connections = self.local.__dict__.setdefault("connections", {})
+        if name not in connections:
+            connections[name] = GnuCash(self.uris[name], read_only=not self.writable)
+        return connections[name]
+
+    def call(self, function, *args, **kwargs):
+        try:
+            return function(self, *args, **kwargs)
+        finally:
+            self.end()
+
+    def end(self):
+        # Sessions stay open between requests, their transactions must not, or
+        # every worker would sit idle in transaction on a database server.
+        for connection in self.local.__dict__.get("connections", {}).values():
+            if "book" in connection.__dict__:
+                session = connection.book.session
+                # Committing a clean session keeps the account index that a
+                # rollback drops.
+                if session.new or session.dirty or session.deleted:
+                    session.rollback()
+                else:
+                    session.commit()
+
+    async def run(self, function, *args, **kwargs):
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, partial(self.call, function, *args, **kwargs)
+        )
+
+    def release(self, barrier):
+        # The barrier makes every worker thread pick up exactly one release.
+        barrier.wait()
+        for connection in self.local.__dict__.pop("connections", {}).values():
+            if "book" in connection.__dict__:
+                connection.book.close()
+
+    def close(self):
+        barrier = threading.Barrier(self.workers)
+        for future in [
+            self.executor.submit(self.release, barrier) for _ in range(self.workers)
+        ]:
+            future.result()
+        self.executor.shutdown()
+
+
+def list_accounts(books, name, pattern):
+    connection = books.connection(name)
+    return [
+        {
+            "fullname": fullname,
+            "type": account.type,
+            "commodity": account.commodity.mnemonic,
+            "description": account.description,
+            "placeholder": bool(account.placeholder),
+        }
+        for fullname in connection.accounts(pattern)
+        for account in (connection.account(fullname),)
+    ]
+
+
+def list_transactions(books, name, patterns, from_date, to_date):
+    connection = books.connection(name)
+    accounts = {
+        account for pattern in patterns for account in connection.accounts(pattern)
+    }
+    if not accounts:
+        return []
+
+    return [
+        {
+            "date": str(record.day),
+            "amount": format_amount(record.amount),
+            "currency": record.currency,
+            "description": record.description,
+        }
+        for record in connection.transactions(
+            *sorted(accounts), from_date=from_date, to_date=to_date
+        )
+    ]
+
+
+def reconcile_upload(books, configuration, detect, fn, target, update, dry_run):
+    # Uploads live in temporary files, there is nothing to cache detection for.
+    importer = target or detect(fn, cache=False)
+    importer, rows, _ = load_statement(fn, importer, importers_of(configuration))
+    cfg = configuration["importers"][importer]
+    name = cfg["connection"]
+    connection = books.connection(name)
+    options = configuration.get("options", {})
+    exporting = update or dry_run
+
+    # Updates hold the book from reconciliation to save, two uploads of one
+    # statement would both export its rows otherwise.
+    with books.write_locks[name] if exporting else nullcontext():
+        if exporting:
+            # Rows saved by other threads must not be hidden by stale state.
+            connection.book.session.rollback()
+
+        messages = reconcile_statement(
+            fn, rows, cfg, connection, options.get("epsilon", 7)
+        )
+
+        warnings, exports = [], []
+        if exporting:
+            exports = list(collect_exports(messages, cfg, connection, warnings.append))
+
+        if exports:
+            try:
+                connection.insert(exports)
+                if not dry_run:
+                    connection.book.save()
+            finally:
+                connection.book.session.rollback()
+
+    return {
+        "importer": str(importer),
+        "book": name,
+        "messages": [
+            {
+                "date": str(date),
+                "amount": amount,
+                "currency": currency,
+                "description": description,
+                "status": status,
+            }
+            for date, amount, currency, description, status, _ in messages
+        ],
+        "exported": len(exports) if update and not dry_run else 0,
+        "checked": len(exports),
+        "warnings": warnings,
+    }
+
+
+def book_of(request):
+    name = request.match_info["book"]
+    if name not in request.app["books"].uris:
+        raise web.HTTPNotFound(text=f"Unknown book {name}.")
+    return name
+
+
+def date_of(request, key):
+    value = request.query.get(key)
+    if value is None:
+        return None
+    try:
+        return datetime.date.fromisoformat(value)
+    except ValueError:
+        raise web.HTTPBadRequest(text=f"Invalid {key} date {value!r}.")
+
+
+def flag_of(request, key):
+    return request.query.get(key, "").lower() in ("1", "true", "yes")
+
+
+@routes.get("/books")
+async def get_books(request):
+    return web.json_response(sorted(request.app["books"].uris))
+
+
+@routes.get("/books/{book}/accounts")
+async def get_accounts(request):
+    name = book_of(request)
+    key = name, request.query.get("pattern", "*")
+    tree = request.app["tree"]
+
+    accounts = tree.get(key)
+    if accounts is None:
+        generation = tree.generations[name]
+        accounts = await request.app["books"].run(list_accounts, *key)
+        tree.put(key, accounts, generation)
+
+    return web.json_response(accounts)
+
+
+@routes.get("/books/{book}/transactions")
+async def get_transactions(request):
+    name = book_of(request)
+    patterns = request.query.getall("account", [])
+    if not patterns:
+        raise web.HTTPBadRequest(text="At least one account is required.")
+
+    return web.json_response(
+        await request.app["books"].run(
+            list_transactions,
+            name,
+            patterns,
+            date_of(request, "from"),
+            date_of(request, "to"),
+        )
+    )
+
+
+@routes.post("/statements")
+async def post_statement(request):
+    configuration = request.app["configuration"]
+    update, dry_run = flag_of(request, "update"), flag_of(request, "dry_run")
+
+    if update and not request.app["books"].writable:
+        raise web.HTTPForbidden(text="The service was started without --writable.")
+
+    target = None
+    if "importer" in request.query:
+        target = next(
+            (
+                importer
+                for importer in configuration["importers"]
+                if str(importer) == request.query["importer"]
+            ),
+            None,
+        )
+        if target is None:
+            raise web.HTTPBadRequest(
+                text=f"Unknown importer {request.query['importer']}."
+            )
+
+    # Parsers read from files, the upload is only kept for the request.
+    with tempfile.TemporaryDirectory() as directory:
+        fn = os.path.join(
+            directory, os.path.basename(request.query.get("name", "")) or "statement"
+        )
+        # File calls block, they run in the default executor, not on the loop.
+        loop = asyncio.get_running_loop()
+        outfile = await loop.run_in_executor(None, open, fn, "wb")
+        try:
+            async for chunk in request.content.iter_chunked(64 * 1024):
+                await loop.run_in_executor(None, outfile.write, chunk)
+        finally:
+            await loop.run_in_executor(None, outfile.close)
+
+        try:
+            result = await request.app["books"].run(
+                reconcile_upload,
+                configuration,
+                request.app["detect"],
+                fn,
+                target,
+                update,
+                dry_run,
+            )
+        except (KeyError, ValueError) as error:
+            raise web.HTTPUnprocessableEntity(
+                text=f"Statement could not be reconciled: {error!r}."
+            )
+
+    if result["exported"]:
+        request.app["tree"].invalidate(result["book"])
+
+    return web.json_response(result)
+
+
+def create_app(configuration, workers=4, writable=False, tree_size=256):
+    app = web.Application()
+    app["configuration"] = configuration
+    app["books"] = Books(
+        dict(configuration.get("connections", {})), workers=workers, writable=writable
+    )
+    app["tree"] = LRUCache(tree_size)
+    app["detect"] = detector_of(configuration)
+    app.add_routes(routes)
+
+    async def close(app):
+        await asyncio.get_running_loop().run_in_executor(None, app["books"].close)
+
+    app.on_cleanup.append(close)
+    return app
+
+
+@click.command()
+@click.option(
+    "--configuration",
+    "-c",
+    type=click.File(encoding="utf-8"),
+    default=os.environ.get("WEBCASH_UTILS_STATEMENTS_CONFIGURATION"),
+    help="Configuration file (YAML).",
+    required=True,
+)
+@click.option("--host", default="127.0.0.1", show_default=True)
+@click.option("--port", type=int, default=8080, show_default=True)
+@click.option(
+    "--workers",
+    type=click.IntRange(min=1),
+    default=4,
+    show_default=True,
+    help="Threads running database calls, each keeps its own sessions.",
+)
+@click.option(
+    "--writable",
+    is_flag=True,
+    default=False,
+    help="Open books for writing so statement uploads can update them.",
+)
+def cli(configuration, host, port, workers, writable):
+    web.run_app(
+        create_app(YAML().load(configuration), workers=workers, writable=writable),
+        host=host,
+        port=port,
+    )
+
+
+if __name__ == "__main__":
+    cli()
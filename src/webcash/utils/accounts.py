@@ -0,0 +1,69 @@
+import re
+
+from fnmatch import translate
+from functools import lru_cache
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern):
+    return re.compile(translate(pattern))
+
+
+def is_literal(segment):
+    return not any(character in segment for character in "*?[")
+
+
+class AccountIndex:
+    """Account fullnames of a book arranged in a trie of ``:`` separated segments.
+
+    Glob patterns descend through their literal leading segments and only the
+    accounts below that point are matched against the compiled pattern, which
+    keeps the ``fnmatch`` semantics (``*`` also spans ``:``).
+    """
+
+    def __init__(self, accounts):
+        self.accounts = {}
+        self.tree = {}
+
+        for account in accounts:
+            fullname = account.fullname
+            self.accounts[fullname] = account
+
+            node = self.tree
+            for segment in fullname.split(":"):
+                node = node.setdefault(segment, {})
+            node[None] = fullname
+
+    def __contains__(self, fullname):
+        return fullname in self.accounts
+
+    def __getitem__(self, fullname):
+        return self.accounts[fullname]
+
+    def __len__(self):
+        return len(self.accounts)
+
+    def match(self, pattern):
+        if pattern in self.accounts:
+            return [pattern]
+
+        node = self.tree
+        for segment in pattern.split(":"):
+            if not is_literal(segment):
+                break
+            if segment not in node:
+                return []
+            node = node[segment]
+
+        regex = compile_pattern(pattern)
+        return [fullname for fullname in self.walk(node) if regex.match(fullname)]
+
+    def walk(self, node):
+        stack = [node]
+        while stack:
+            node = stack.pop()
+            for segment, child in node.items():
+                if segment is None:
+                    yield child
+                else:
+                    stack.append(child)
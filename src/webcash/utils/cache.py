@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import zlib
+import sqlite3
+import hashlib
+
+from functools import cached_property
+
+from webcash.utils.records import Record
+
+
+def default_path():
+    return os.path.join(
+        os.environ.get("XDG_CACHE_HOME", os.path.expanduser("~/.cache")),
+        "webcash",
+        "statements.sqlite",
+    )
+
+
+def file_digest(fn):
+    with open(fn, "rb") as stream:
+        return hashlib.file_digest(stream, "sha256").hexdigest()
+
+
+class StatementCache:
+    def __init__(self, path=None, max_size=64 * 1024 * 1024, max_age=90):
+        self.path = path or default_path()
+        self.max_size = max_size
+        self.max_age = max_age
+
+    def __getstate__(self):
+        # Worker processes open their own connection.
+        state = self.__dict__.copy()
+        state.pop("connection", None)
+        return state
+
+    @cached_property
+    def connection(self):
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS statements ("
+            " digest TEXT NOT NULL,"
+            " parser TEXT NOT NULL,"
+            " version INTEGER NOT NULL,"
+            " encoding TEXT NOT NULL,"
+            " accessed REAL NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " rows BLOB NOT NULL,"
+            " PRIMARY KEY (digest, parser, version, encoding))"
+        )
+        return connection
+
+    def get(self, digest, parser, version, encoding=None):
+        # Detected encodings are stored as an empty string, NULL never matches.
+        key = digest, parser, version, encoding or ""
+        row = self.connection.execute(
+            "SELECT rows FROM statements"
+            " WHERE digest=? AND parser=? AND version=? AND encoding=?",
+            key,
+        ).fetchone()
+
+        if row is None:
+            return None
+
+        self.connection.execute(
+            "UPDATE statements SET accessed=?"
+            " WHERE digest=? AND parser=? AND version=? AND encoding=?",
+            (time.time(), *key),
+        )
+
+        return [Record(*fields) for fields in json.loads(zlib.decompress(row[0]))]
+
+    def put(self, digest, parser, version, encoding, rows):
+        blob = zlib.compress(
+            json.dumps(list(map(tuple, rows)), separators=(",", ":")).encode("utf-8")
+        )
+        self.connection.execute(
+            "INSERT OR REPLACE INTO statements VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (digest, parser, version, encoding or "", time.time(), len(blob), blob),
+        )
+
+    def evict(self):
+        if self.max_age is not None:
+            self.connection.execute(
+                "DELETE FROM statements WHERE accessed < ?",
+                (time.time() - self.max_age * 86400,),
+            )
+
+        if self.max_size is not None:
+            total = 0
+            for rowid, size in self.connection.execute(
+                "SELECT rowid, size FROM statements ORDER BY accessed DESC"
+            ).fetchall():
+                total += size
+                if total > self.max_size:
+                    self.connection.execute(
+                        "DELETE FROM statements WHERE rowid=?", (rowid,)
+                    )
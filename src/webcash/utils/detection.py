@@ -0,0 +1,148 @@
+import re
+import os
+import csv
+
+from collections import defaultdict
+
+from webcash.utils.encoding import BOMS
+
+
+HEAD_SIZE = 4096
+
+iban_pattern = re.compile(
+    r"[0-9]{2} ?[0-9]{4} ?[0-9]{4} ?[0-9]{4} ?[0-9]{4} ?[0-9]{4} ?[0-9]{4}"
+)
+
+
+class DetectionError(ValueError):
+    pass
+
+
+class Signature:
+    """Traits of a statement format visible in the first few kilobytes."""
+
+    __slots__ = ("delimiter", "columns", "date", "keywords", "tag")
+
+    def __init__(self, delimiter=None, columns=None, date=None, keywords=(), tag=None):
+        self.delimiter = delimiter
+        self.columns = columns
+        self.date = date
+        self.keywords = keywords
+        self.tag = tag
+
+    def matches(self, lines):
+        text = "\n".join(lines)
+
+        if self.tag is not None and not re.search(rf"<{self.tag}[\s>/]", text):
+            return False
+
+        if any(keyword not in text for keyword in self.keywords):
+            return False
+
+        if self.columns is None:
+            return True
+
+        try:
+            return any(
+                len(row) in self.columns and self.date.match(row[0])
+                for row in csv.reader(lines, delimiter=self.delimiter)
+            )
+        except csv.Error:
+            return False
+
+
+def decode_head(head):
+    # Only markers and digits are looked at, all of them ASCII, so a byte
+    # transparent codec is enough unless the file is in a wide encoding.
+    for bom, encoding in BOMS:
+        if head.startswith(bom) and encoding != "utf-8-sig":
+            return head.decode(encoding, errors="ignore")
+    return head.decode("latin-1")
+
+
+def normalize_iban(key):
+    # YAML loads unquoted account numbers as integers, which drops a leading
+    # zero of the check digits, so both sides are compared as integers.
+    digits = re.sub(r"[^0-9]", "", str(key))
+    return int(digits) if digits else None
+
+
+class Detector:
+    def __init__(self, importers, signatures, head_size=HEAD_SIZE):
+        # importers maps configuration keys to format names.
+        self.importers = dict(importers)
+        self.signatures = signatures
+        self.head_size = head_size
+        self.ibans = {
+            normalize_iban(key): key
+            for key in importers
+            if normalize_iban(key) is not None
+        }
+        self.formats = defaultdict(list)
+        for key, name in importers.items():
+            self.formats[name].append(key)
+        self.results = {}
+
+    def __call__(self, fn, cache=True):
+        path = os.path.abspath(fn)
+        stat = os.stat(path)
+        signature = stat.st_mtime_ns, stat.st_size
+
+        cached = self.results.get(path) if cache else None
+        if cached is None or cached[0] != signature:
+            with open(path, "rb") as infile:
+                head = infile.read(self.head_size)
+            cached = signature, self.classify(head, len(head) == stat.st_size)
+            if cache:
+                self.results[path] = cached
+
+        if cached[1] is None:
+            raise DetectionError(f"Could not detect the importer of {fn}.")
+        return cached[1]
+
+    def classify(self, head, complete=True):
+        text = decode_head(head)
+        lines = text.splitlines()
+        if not complete:
+            # The last line is most likely cut short.
+            lines = lines[:-1]
+
+        matching = {}
+
+        def matches(name):
+            if name not in matching:
+                signature = self.signatures.get(name)
+                matching[name] = signature is not None and signature.matches(lines)
+            return matching[name]
+
+        found, unknown = [], False
+        for match in iban_pattern.finditer(text):
+            importer = self.ibans.get(normalize_iban(match.group(0)))
+            if importer is None:
+                unknown = True
+            elif importer not in found:
+                found.append(importer)
+
+        # Counterparty accounts can be configured importers as well, the
+        # format of the file decides between them. An account that is not
+        # configured may own the file, so a configured one found next to it
+        # must also match its format, or its rows would be reconciled against
+        # the wrong account.
+        if unknown or len(found) > 1:
+            matched = [
+                importer for importer in found if matches(self.importers[importer])
+            ]
+            found = matched if unknown else matched or found
+
+        if found:
+            return found[0]
+
+        if unknown:
+            return None
+
+        # Formats without an account number only need to be unambiguous.
+        matched = [name for name in self.formats if matches(name)]
+        if len(matched) == 1 and len(self.formats[matched[0]]) == 1:
+            return self.formats[matched[0]][0]
+
+        return None
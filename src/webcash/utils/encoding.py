@@ -0,0 +1,68 @@
+import io
+import codecs
+
+from webcash.utils import profiling
+
+
+CHUNK_SIZE = 64 * 1024
+
+# UTF-32 marks have to be checked before UTF-16 ones, they share a prefix.
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+
+def detect_encoding(stream, chunk_size=CHUNK_SIZE):
+    chunk = stream.read(chunk_size)
+
+    for bom, encoding in BOMS:
+        if chunk.startswith(bom):
+            return encoding
+
+    detector = None
+
+    while chunk:
+        if detector is None:
+            if chunk.isascii():
+                chunk = stream.read(chunk_size)
+                continue
+
+            # Multi-byte UTF-8 sequences practically never validate by accident
+            # in legacy code pages, so the first non-ASCII chunk settles it.
+            try:
+                codecs.getincrementaldecoder("utf-8")().decode(chunk, final=False)
+                return "utf-8"
+            except UnicodeDecodeError:
+                # chardet is slow to import and plain UTF-8 files never need it.
+                from chardet.universaldetector import UniversalDetector
+
+                detector = UniversalDetector()
+
+        detector.feed(chunk)
+        if detector.done:
+            break
+        chunk = stream.read(chunk_size)
+
+    if detector is None:
+        return "ascii"
+
+    detector.close()
+    return detector.result["encoding"] or "utf-8"
+
+
+def text(fn, encoding=None):
+    stream = open(fn, "rb")
+
+    try:
+        if encoding is None:
+            with profiling.profiler.stage("encoding", fn):
+                encoding = detect_encoding(stream)
+            stream.seek(0)
+        return io.TextIOWrapper(stream, encoding=encoding, newline="")
+    except BaseException:
+        stream.close()
+        raise
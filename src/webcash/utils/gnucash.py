@@ -0,0 +1,246 @@
+import os
+import datetime
+
+from collections import defaultdict
+from functools import cached_property
+
+from piecash import open_book
+from piecash import Account, Commodity, Transaction, Split
+from sqlalchemy import event, extract, func
+
+from webcash.utils import profiling
+from webcash.utils.accounts import AccountIndex
+from webcash.utils.records import Record, minor_units_of
+
+
+class GnuCash:
+    def __init__(self, uri, read_only=True):
+        self.uri = uri
+        self.read_only = read_only
+
+    @cached_property
+    def book(self):
+        with profiling.profiler.stage("open_book", self.uri):
+            book = open_book(
+                uri_conn=self.uri,
+                readonly=self.read_only,
+                open_if_lock=True,
+                do_backup=False,
+            )
+        event.listen(book.session, "after_flush", self.after_flush)
+        event.listen(book.session, "after_rollback", self.after_rollback)
+        return book
+
+    @cached_property
+    def index(self):
+        return AccountIndex(self.book.accounts)
+
+    def after_flush(self, session, context):
+        if any(
+            isinstance(instance, Account)
+            for instance in (*session.new, *session.dirty, *session.deleted)
+        ):
+            self.__dict__.pop("index", None)
+
+    def after_rollback(self, session):
+        self.__dict__.pop("index", None)
+
+    def fingerprint(self):
+        # SQLite books are single files, anything else is summarised by a query.
+        url = self.book.session.bind.url
+        if url.get_backend_name() == "sqlite" and url.database:
+            stat = os.stat(url.database)
+            return stat.st_mtime_ns, stat.st_size
+
+        return tuple(
+            self.book.session.query(
+                func.count(Split.guid),
+                func.sum(Split._quantity_num),
+                func.max(Transaction.enter_date),
+            )
+            .select_from(Split)
+            .join(Split.transaction)
+            .one()
+        ) + (self.book.session.query(func.count(Account.guid)).scalar(),)
+
+    def accounts(self, pattern):
+        yield from self.index.match(pattern)
+
+    def account(self, fullname):
+        return self.index[fullname]
+
+    def transactions(self, *accounts, from_date=None, to_date=None, batch_size=1000):
+        query = (
+            self.book.session.query(
+                Transaction.post_date,
+                Split._quantity_num,
+                Split._quantity_denom,
+                Commodity.mnemonic,
+                Transaction.description,
+            )
+            .select_from(Split)
+            .join(Split.transaction)
+            .join(Transaction.currency)
+            .filter(
+                Split.account_guid.in_(
+                    [self.account(account).guid for account in accounts]
+                )
+            )
+        )
+
+        if from_date is not None:
+            query = query.filter(Transaction.post_date >= from_date)
+
+        if to_date is not None:
+            query = query.filter(Transaction.post_date <= to_date)
+
+        for date, numerator, denominator, currency, description in (
+            query.order_by(Transaction.post_date.desc())
+            .execution_options(stream_results=True)
+            .yield_per(batch_size)
+        ):
+            yield Record(
+                date.toordinal(),
+                minor_units_of(numerator, denominator),
+                currency,
+                description,
+            )
+
+    def splits(self, *columns, accounts, from_date=None, to_date=None):
+        # Quantities are in the account commodity, unlike the transaction
+        # currency reported by transactions().
+        query = (
+            self.book.session.query(*columns)
+            .select_from(Split)
+            .join(Split.transaction)
+            .join(Split.account)
+            .join(Account.commodity)
+            .filter(
+                Split.account_guid.in_(
+                    [self.account(account).guid for account in accounts]
+                )
+            )
+        )
+
+        if from_date is not None:
+            query = query.filter(Transaction.post_date >= from_date)
+
+        if to_date is not None:
+            query = query.filter(Transaction.post_date <= to_date)
+
+        return query
+
+    def balance(self, *accounts, from_date=None, to_date=None):
+        balance = defaultdict(int)
+        for currency, denominator, numerator in self.splits(
+            Commodity.mnemonic,
+            Split._quantity_denom,
+            func.sum(Split._quantity_num),
+            accounts=accounts,
+            from_date=from_date,
+            to_date=to_date,
+        ).group_by(Commodity.mnemonic, Split._quantity_denom):
+            balance[currency] += minor_units_of(numerator, denominator)
+        return dict(balance)
+
+    def totals(self, *accounts, period="day", from_date=None, to_date=None):
+        opening = (
+            self.balance(*accounts, to_date=from_date - datetime.timedelta(1))
+            if from_date is not None
+            else {}
+        )
+
+        columns = periods[period]()
+        partition = Commodity.mnemonic, Split._quantity_denom
+        rows = self.splits(
+            *columns,
+            *partition,
+            func.count(Split.guid),
+            func.sum(Split._quantity_num),
+            func.sum(func.sum(Split._quantity_num)).over(
+                partition_by=partition, order_by=columns or None
+            ),
+            accounts=accounts,
+            from_date=from_date,
+            to_date=to_date,
+        ).group_by(*columns, *partition)
+
+        # Sums are kept per denominator in SQL and only converted to minor units
+        # here. The running sums of denominators without splits in a period are
+        # carried forward.
+        running = {}
+        current, totals = None, {}
+
+        def flush():
+            for currency, (count, total) in sorted(totals.items()):
+                yield (
+                    current,
+                    currency,
+                    count,
+                    total,
+                    opening.get(currency, 0)
+                    + sum(
+                        minor_units_of(numerator, denominator)
+                        for (other, denominator), numerator in running.items()
+                        if other == currency
+                    ),
+                )
+
+        for *key, currency, denominator, count, numerator, cumulative in rows.order_by(
+            *columns
+        ):
+            key = period_start(period, key)
+            if key != current:
+                yield from flush()
+                current, totals = key, {}
+
+            running[currency, denominator] = cumulative
+            subtotal = totals.get(currency, (0, 0))
+            totals[currency] = (
+                subtotal[0] + count,
+                subtotal[1] + minor_units_of(numerator, denominator),
+            )
+
+        yield from flush()
+
+    def insert(self, transactions, batch_size=1000):
+        currencies = {
+            commodity.mnemonic: commodity
+            for commodity in self.book.commodities
+            if commodity.namespace == "CURRENCY"
+        }
+
+        for count, (record, source, target) in enumerate(transactions, start=1):
+            self.book.session.add(
+                Transaction(
+                    currency=currencies[record.currency],
+                    description=record.description,
+                    post_date=record.day,
+                    splits=[
+                        Split(account=self.account(source), value=record.value),
+                        Split(account=self.account(target), value=-record.value),
+                    ],
+                )
+            )
+            if count % batch_size == 0:
+                self.book.flush()
+
+        self.book.flush()
+
+
+periods = {
+    "day": lambda: (Transaction.post_date,),
+    "month": lambda: (
+        extract("year", Transaction.post_date),
+        extract("month", Transaction.post_date),
+    ),
+    "total": lambda: (),
+}
+
+
+def period_start(period, key):
+    if period == "day":
+        return key[0]
+    if period == "month":
+        return datetime.date(int(key[0]), int(key[1]), 1)
+    return None
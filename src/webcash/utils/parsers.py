@@ -0,0 +1,105 @@
+import re
+import csv
+import datetime
+
+from webcash.utils.detection import Signature
+from webcash.utils.encoding import text
+from webcash.utils.records import Record, minor_units
+
+
+YMD_pattern = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
+DMY_pattern = re.compile(r"[0-9]{2}-[0-9]{2}-[0-9]{4}")
+
+
+def version(number):
+    def decorator(function):
+        function.version = number
+        return function
+
+    return decorator
+
+
+@version(2)
+def parse_mbank_csv(fn, encoding=None):
+    with text(fn, encoding) as infile:
+        reader = csv.reader(infile, delimiter=";")
+        for line in reader:
+            if len(line) == 7 and YMD_pattern.match(line[0]):
+                integral, fraction, currency = re.match(
+                    r"(-?[0-9]+),([0-9]+)([A-Z]+)", line[4].replace(" ", "")
+                ).groups()
+                yield Record(
+                    datetime.date(*map(int, line[0].split("-"))).toordinal(),
+                    minor_units(f"{integral}.{fraction}"),
+                    currency,
+                    re.sub(r"\s+", " ", line[1].strip()),
+                )
+
+
+@version(2)
+def parse_santander_csv(fn, encoding=None):
+    with text(fn, encoding) as infile:
+        reader = csv.reader(infile, delimiter=",")
+        for line in reader:
+            if len(line) == 9 and DMY_pattern.match(line[0]):
+                yield Record(
+                    datetime.date(*map(int, reversed(line[1].split("-")))).toordinal(),
+                    minor_units(line[5].replace(",", ".")),
+                    "PLN",
+                    line[2].strip(),
+                )
+
+
+@version(2)
+def parse_ing_csv(fn, encoding=None):
+    with text(fn, encoding) as infile:
+        reader = csv.reader(infile, delimiter=";")
+        for line in reader:
+            if len(line) == 21 and YMD_pattern.match(line[0]):
+                yield Record(
+                    datetime.date(*map(int, line[0].split("-"))).toordinal(),
+                    minor_units(line[8 if line[1] else 10].replace(",", ".")),
+                    "PLN",
+                    line[2].strip() + " " + line[3].strip(),
+                )
+
+
+@version(2)
+def parse_nest_csv(fn, encoding=None):
+    with text(fn, encoding) as infile:
+        reader = csv.reader(infile, delimiter=",")
+        for line in reader:
+            if len(line) > 9 and DMY_pattern.match(line[0]):
+                yield Record(
+                    datetime.date(*map(int, reversed(line[0].split("-")))).toordinal(),
+                    minor_units(line[3]),
+                    "PLN",
+                    line[7],
+                )
+
+
+@version(2)
+def parse_revolut_csv(fn, encoding=None):
+    with text(fn, encoding) as infile:
+        reader = csv.reader(infile, delimiter=",")
+        for line in reader:
+            if YMD_pattern.match(line[2]):
+                yield Record(
+                    datetime.date(
+                        *map(int, line[2].split(" ")[0].split("-"))
+                    ).toordinal(),
+                    minor_units(line[5]),
+                    line[7],
+                    line[4],
+                )
+
+
+# Mirrors the rows each parser accepts, used to tell files apart by their head.
+signatures = {
+    "mBank": Signature(delimiter=";", columns={7}, date=YMD_pattern),
+    "Santander": Signature(delimiter=",", columns={9}, date=DMY_pattern),
+    "ING": Signature(delimiter=";", columns={21}, date=YMD_pattern),
+    "Toyota": Signature(tag="operacja"),
+    "Nest": Signature(delimiter=",", columns=range(10, 256), date=DMY_pattern),
+    "Revolut": Signature(delimiter=",", keywords=("Started Date", "Completed Date")),
+}
@@ -0,0 +1,176 @@
+import os
+import sys
+import time
+import threading
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+def entry(name, file, wall, cpu, rows):
+    return {
+        "stage": name,
+        "file": file,
+        "pid": os.getpid(),
+        "wall": wall,
+        "cpu": cpu,
+        "rows": rows,
+    }
+
+
+class Measurement:
+    __slots__ = ("profiler", "name", "file", "rows", "wall", "cpu")
+
+    def __init__(self, profiler, name, file):
+        self.profiler = profiler
+        self.name = name
+        self.file = file
+        self.rows = None
+
+    def __enter__(self):
+        self.profiler.enter()
+        self.wall = time.perf_counter()
+        self.cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc_info):
+        wall, cpu = self.profiler.leave(
+            time.perf_counter() - self.wall, time.process_time() - self.cpu
+        )
+        self.profiler.records.append(
+            entry(self.name, self.file, wall=wall, cpu=cpu, rows=self.rows)
+        )
+
+
+class Profiler:
+    enabled = True
+
+    def __init__(self):
+        self.records = []
+        self.started = time.perf_counter()
+        self.local = threading.local()
+
+    def enter(self):
+        if not hasattr(self.local, "frames"):
+            self.local.frames = []
+        self.local.frames.append([0.0, 0.0])
+
+    def leave(self, wall, cpu):
+        # Stages are recorded exclusively, the time spent in stages nested in
+        # them (opening a book while querying it) is only counted once.
+        frames = self.local.frames
+        nested_wall, nested_cpu = frames.pop()
+        if frames:
+            frames[-1][0] += wall
+            frames[-1][1] += cpu
+        return wall - nested_wall, cpu - nested_cpu
+
+    def stage(self, name, file=None):
+        return Measurement(self, name, file)
+
+    def iterate(self, name, iterable, file=None):
+        # Only the time spent producing items is attributed to the stage.
+        record = entry(name, file, wall=0.0, cpu=0.0, rows=0)
+        self.records.append(record)
+        iterator = iter(iterable)
+
+        while True:
+            self.enter()
+            wall, cpu = time.perf_counter(), time.process_time()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                wall, cpu = self.leave(
+                    time.perf_counter() - wall, time.process_time() - cpu
+                )
+                record["wall"] += wall
+                record["cpu"] += cpu
+            record["rows"] += 1
+            yield item
+
+    def drain(self):
+        records, self.records = self.records, []
+        return records
+
+    def extend(self, records):
+        self.records.extend(records)
+
+    def summary(self):
+        stages = {}
+        for record in self.records:
+            stage = stages.setdefault(
+                record["stage"], {"calls": 0, "wall": 0.0, "cpu": 0.0, "rows": 0}
+            )
+            stage["calls"] += 1
+            stage["wall"] += record["wall"]
+            stage["cpu"] += record["cpu"]
+            stage["rows"] += record["rows"] or 0
+
+        return {
+            "wall": time.perf_counter() - self.started,
+            "peak_memory": peak_memory(),
+            "stages": stages,
+            "records": self.records,
+        }
+
+
+class Disabled:
+    __slots__ = ()
+
+    enabled = False
+    rows = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+    def __setattr__(self, name, value):
+        pass
+
+    def stage(self, name, file=None):
+        return self
+
+    def iterate(self, name, iterable, file=None):
+        return iterable
+
+    def drain(self):
+        return []
+
+    def extend(self, records):
+        pass
+
+
+profiler = Disabled()
+
+
+def enable():
+    global profiler
+    if not profiler.enabled:
+        profiler = Profiler()
+    return profiler
+
+
+def reset():
+    # Forked workers start with a copy of the parent's records, which would be
+    # reported twice once they are sent back.
+    global profiler
+    if profiler.enabled:
+        profiler = Profiler()
+
+
+def peak_memory():
+    if resource is None:
+        return None
+
+    # ru_maxrss is reported in kilobytes on Linux and in bytes on macOS.
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
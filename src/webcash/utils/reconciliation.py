@@ -0,0 +1,91 @@
+import datetime
+
+from bisect import bisect_left
+
+
+class Reconciliation:
+    """Matches book records against statement records sharing amount and currency.
+
+    Statement records are indexed per ``(amount, currency)`` as a sorted list of
+    date ordinals, so finding the nearest unmatched record within ``epsilon``
+    days is a bisection instead of probing every shifted date.
+    """
+
+    def __init__(self, records, epsilon=7):
+        self.epsilon = epsilon
+        self.pending = {}
+
+        for record in records:
+            self.pending.setdefault((record.amount, record.currency), {}).setdefault(
+                record.date, []
+            ).append(record)
+
+        self.dates = {key: sorted(pending) for key, pending in self.pending.items()}
+
+        self.from_date = min((dates[0] for dates in self.dates.values()), default=None)
+        self.to_date = max((dates[-1] for dates in self.dates.values()), default=None)
+
+    @property
+    def window(self):
+        return (
+            datetime.date.fromordinal(self.from_date - self.epsilon),
+            datetime.date.fromordinal(self.to_date + self.epsilon),
+        )
+
+    def duplicates(self):
+        for pending in self.pending.values():
+            for records in pending.values():
+                if len(records) > 1:
+                    yield from records
+
+    def match(self, record):
+        key = record.amount, record.currency
+        dates = self.dates.get(key)
+
+        if not dates:
+            return None
+
+        date = record.date
+        index = bisect_left(dates, date)
+
+        # Prefer the exact date, then the earlier of two equally distant ones.
+        if index == len(dates) or (
+            index and date - dates[index - 1] <= dates[index] - date
+        ):
+            index -= 1
+
+        if abs(dates[index] - date) > self.epsilon:
+            return None
+
+        matched = dates[index]
+        records = self.pending[key][matched]
+        records.pop()
+
+        if not records:
+            del self.pending[key][matched]
+            del dates[index]
+
+        return matched
+
+    def unmatched(self):
+        for pending in self.pending.values():
+            for records in pending.values():
+                yield from records
+
+    def reconcile(self, records):
+        for record in self.duplicates():
+            yield record, "DUPLICATE"
+
+        for record in records:
+            matched = self.match(record)
+            if matched is None:
+                if self.from_date <= record.date <= self.to_date:
+                    yield record, "GNUCASH"
+            elif matched != record.date:
+                yield (
+                    record,
+                    f"\N{RIGHTWARDS ARROW} {datetime.date.fromordinal(matched)}",
+                )
+
+        for record in self.unmatched():
+            yield record, "EXPORT"
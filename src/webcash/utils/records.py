@@ -0,0 +1,67 @@
+import sys
+import datetime
+
+from decimal import Decimal
+from fractions import Fraction
+
+
+def minor_units(amount):
+    sign = -1 if amount.startswith("-") else 1
+    integral, _, fraction = amount.lstrip("+-").partition(".")
+
+    if len(fraction) <= 2 and (integral + fraction).isdigit():
+        return sign * (int(integral or 0) * 100 + int(fraction.ljust(2, "0")))
+
+    return int(Decimal(amount).scaleb(2).to_integral_value())
+
+
+def minor_units_of(numerator, denominator):
+    if 100 % denominator == 0:
+        return numerator * (100 // denominator)
+    return round(Fraction(numerator * 100, denominator))
+
+
+def format_amount(amount):
+    sign = "-" if amount < 0 else ""
+    return f"{sign}{abs(amount) // 100}.{abs(amount) % 100:02d}"
+
+
+class Record:
+    """Single statement or book entry.
+
+    ``date`` is a proleptic Gregorian ordinal, ``amount`` is expressed in minor
+    units (hundredths) and ``currency`` is an interned ISO code.
+    """
+
+    __slots__ = ("date", "amount", "currency", "description")
+
+    def __init__(self, date, amount, currency, description):
+        self.date = date
+        self.amount = amount
+        self.currency = sys.intern(currency)
+        self.description = description
+
+    @property
+    def day(self):
+        return datetime.date.fromordinal(self.date)
+
+    @property
+    def value(self):
+        return Decimal(self.amount).scaleb(-2)
+
+    def __iter__(self):
+        yield self.date
+        yield self.amount
+        yield self.currency
+        yield self.description
+
+    def __eq__(self, other):
+        if not isinstance(other, Record):
+            return NotImplemented
+        return tuple(self) == tuple(other)
+
+    def __repr__(self):
+        return (
+            f"Record({self.day}, {format_amount(self.amount)}, {self.currency},"
+            f" {self.description!r})"
+        )
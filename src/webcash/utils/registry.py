@@ -0,0 +1,53 @@
+import importlib
+
+from collections.abc import Mapping
+
+
+def resolve(spec):
+    module, _, attribute = spec.partition(":")
+    value = importlib.import_module(module)
+    for name in filter(None, attribute.split(".")):
+        value = getattr(value, name)
+    return value
+
+
+class Registry(Mapping):
+    """Names mapped to "module:attribute" specs imported on first lookup.
+
+    Entry points of ``group`` add further names, they are only scanned when a
+    name is not built in or the whole registry is listed.
+    """
+
+    def __init__(self, group, specs):
+        self.group = group
+        self.specs = dict(specs)
+        self.loaded = {}
+        self.discovered = False
+
+    def discover(self):
+        if not self.discovered:
+            from importlib.metadata import entry_points
+
+            for entry_point in entry_points(group=self.group):
+                self.specs.setdefault(entry_point.name, entry_point.value)
+            self.discovered = True
+
+    def __getitem__(self, name):
+        if name not in self.loaded:
+            if name not in self.specs:
+                self.discover()
+            self.loaded[name] = resolve(self.specs[name])
+        return self.loaded[name]
+
+    def __contains__(self, name):
+        if name not in self.specs:
+            self.discover()
+        return name in self.specs
+
+    def __iter__(self):
+        self.discover()
+        return iter(self.specs)
+
+    def __len__(self):
+        self.discover()
+        return len(self.specs)
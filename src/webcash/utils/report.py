@@ -0,0 +1,96 @@
+import csv
+import json
+
+from colorama import Fore, Style
+
+
+HEADERS = ("Date", "Amount", "Currency", "Description", "Status")
+
+STYLE = {"DUPLICATE": Style.DIM, "GNUCASH": Fore.WHITE, "EXPORT": Style.BRIGHT}
+
+# Same layout as tabulate's "simple" format, headers get two extra columns.
+PADDING = 2
+SEPARATOR = "  "
+
+
+def write_table(messages, stream, statement=None, truncate=140):
+    widths = [len(header) + PADDING for header in HEADERS]
+    for date, amount, currency, description, status, _ in messages:
+        widths[0] = max(widths[0], len(str(date)))
+        widths[1] = max(widths[1], len(amount))
+        widths[2] = max(widths[2], len(currency))
+        widths[3] = max(widths[3], min(len(description), truncate))
+        widths[4] = max(widths[4], len(status))
+
+    date_width, amount_width, currency_width, description_width, _ = widths
+
+    stream.write(
+        SEPARATOR.join(
+            header.rjust(width) if index == 1 and messages else header.ljust(width)
+            for index, (header, width) in enumerate(zip(HEADERS, widths))
+        ).rstrip()
+        + "\n"
+    )
+    stream.write(SEPARATOR.join("-" * width for width in widths) + "\n")
+
+    for date, amount, currency, description, status, _ in messages:
+        stream.write(
+            f"{STYLE.get(status, Style.DIM)}{date!s:<{date_width}}{SEPARATOR}"
+            f"{amount:>{amount_width}}{SEPARATOR}"
+            f"{currency:<{currency_width}}{SEPARATOR}"
+            f"{description[:truncate]:<{description_width}}{SEPARATOR}"
+            f"{status}{Style.RESET_ALL}\n"
+        )
+
+
+def write_csv(messages, stream, statement=None):
+    writer = csv.writer(stream)
+    for date, amount, currency, description, status, _ in messages:
+        writer.writerow((statement, date, amount, currency, description, status))
+
+
+def write_csv_header(stream):
+    csv.writer(stream).writerow(("statement", *map(str.lower, HEADERS)))
+
+
+def write_jsonl(messages, stream, statement=None):
+    for date, amount, currency, description, status, _ in messages:
+        stream.write(
+            json.dumps(
+                {
+                    "statement": statement,
+                    "date": str(date),
+                    "amount": amount,
+                    "currency": currency,
+                    "description": description,
+                    "status": status,
+                },
+                ensure_ascii=False,
+            )
+            + "\n"
+        )
+
+
+def write_summary(headers, rows, stream, output_format):
+    if output_format == "table":
+        import tabulate
+
+        stream.write(
+            tabulate.tabulate(rows, headers=headers, floatfmt=".2f", missingval="")
+            + "\n"
+        )
+    elif output_format == "csv":
+        writer = csv.writer(stream)
+        writer.writerow(map(str.lower, headers))
+        writer.writerows(rows)
+    else:
+        keys = tuple(map(str.lower, headers))
+        for row in rows:
+            stream.write(json.dumps(dict(zip(keys, row)), ensure_ascii=False) + "\n")
+
+
+writers = {
+    "table": (write_table, None),
+    "csv": (write_csv, write_csv_header),
+    "jsonl": (write_jsonl, None),
+}
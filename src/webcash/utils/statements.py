@@ -1,178 +1,275 @@
-import re
 import os
-import csv
+import time
 import datetime
-import tabulate
-
-import chardet
-from io import StringIO
+import json
+import cProfile
 
 import click
 
 from unidecode import unidecode
-from ruamel.yaml import YAML
-from lxml import etree
-
-from colorama import Fore, Style
-from furl import furl
 
 from getpass import getpass
 
 from glob import glob
-from decimal import Decimal
-from collections import defaultdict
-from functools import cached_property
-from fnmatch import fnmatch
+from collections import deque
+from functools import partial
+from contextlib import nullcontext
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from webcash.utils import profiling
+from webcash.utils.cache import StatementCache, file_digest
+from webcash.utils.detection import DetectionError, Detector
+from webcash.utils.parsers import signatures
+from webcash.utils.reconciliation import Reconciliation
+from webcash.utils.records import format_amount
+from webcash.utils.registry import Registry
+from webcash.utils.report import write_summary, writers
+from webcash.utils.watch import DirectoryScanner, SplitCache
+
+
+# Heavy dependencies (piecash and SQLAlchemy, lxml) are only imported once a
+# book is opened or a statement in a format needing them is parsed.
+parser = Registry(
+    "webcash.parsers",
+    {
+        "mBank": "webcash.utils.parsers:parse_mbank_csv",
+        "Santander": "webcash.utils.parsers:parse_santander_csv",
+        "ING": "webcash.utils.parsers:parse_ing_csv",
+        "Toyota": "webcash.utils.toyota:parse_toyota_xml",
+        "Nest": "webcash.utils.parsers:parse_nest_csv",
+        "Revolut": "webcash.utils.parsers:parse_revolut_csv",
+    },
+)
 
-from piecash import open_book
-from piecash import Commodity, Transaction, Split
+backends = Registry("webcash.backends", {"gnucash": "webcash.utils.gnucash:GnuCash"})
 
 
-YMD_pattern = re.compile(r"[0-9]{4}-[0-9]{2}-[0-9]{2}")
-DMY_pattern = re.compile(r"[0-9]{2}-[0-9]{2}-[0-9]{4}")
-iban_pattern = re.compile(
-    r"[0-9]{2} ?[0-9]{4} ?[0-9]{4} ?[0-9]{4} ?[0-9]{4} ?[0-9]{4} ?[0-9]{4}"
-)
+def load_statement(in_file, importer, importers, cache=None, profile=False):
+    if profile:
+        profiling.enable()
 
+    name, encoding = importers[importer]
+    parse = parser[name]
+    # Parsers from other packages do not have to declare a version.
+    version = getattr(parse, "version", 0)
 
-class GnuCash:
-    def __init__(self, uri, read_only=True):
-        self.uri = uri
-        self.read_only = read_only
+    if cache is not None:
+        with profiling.profiler.stage("cache", in_file) as measurement:
+            digest = file_digest(in_file)
+            rows = cache.get(digest, name, version, encoding)
+            measurement.rows = len(rows) if rows is not None else None
+        if rows is not None:
+            return importer, rows, profiling.profiler.drain()
 
-    @cached_property
-    def book(self):
-        return open_book(
-            uri_conn=self.uri,
-            readonly=self.read_only,
-            open_if_lock=True,
-            do_backup=False,
-        )
+    with profiling.profiler.stage("parse", in_file) as measurement:
+        rows = list(parse(in_file, encoding))
+        for record in rows:
+            record.description = unidecode(record.description)
+        measurement.rows = len(rows)
 
-    def accounts(self, pattern):
-        for account in self.book.accounts:
-            if fnmatch(account.fullname, pattern):
-                yield account.fullname
-
-    def transactions(self, account, from_date=None, to_date=None):
-        query = (
-            self.book.session.query(Split.quantity)
-            .join(Transaction)
-            .join(Commodity)
-            .filter(Split.account == self.book.accounts(fullname=account))
-            .add_columns(
-                Commodity.mnemonic, Transaction.description, Transaction.post_date
-            )
-        )
+    if cache is not None:
+        cache.put(digest, name, version, encoding, rows)
 
-        if from_date is not None:
-            query = query.filter(Transaction.post_date >= from_date)
+    return importer, rows, profiling.profiler.drain()
 
-        if to_date is not None:
-            query = query.filter(Transaction.post_date <= to_date)
 
-        for row in query.order_by(Transaction.post_date.desc()).all():
-            yield row[-1], *row[:-1]
+def load_configuration(stream):
+    from ruamel.yaml import YAML
 
+    return YAML().load(stream)
 
-def detect_importer_from_file(fn):
-    with open(fn, "rb") as buffer:
-        return int(
-            iban_pattern.search(buffer.read(1024).decode("ascii", errors="ignore"))
-            .group(0)
-            .replace(" ", "")
-        )
 
+def open_connections(configuration, elevate):
+    username, password = (
+        (input("Username: "), getpass("Password: ")) if elevate else (None, None)
+    )
 
-def text(fn):
-    with open(fn, "rb") as stream:
-        buffer = stream.read()
-        return StringIO(buffer.decode(chardet.detect(buffer)["encoding"]))
-
-
-def parse_mbank_csv(fn):
-    with text(fn) as infile:
-        reader = csv.reader(infile, delimiter=";")
-        for line in reader:
-            if len(line) == 7 and YMD_pattern.match(line[0]):
-                integral, fraction, currency = re.match(
-                    r"(-?[0-9]+),([0-9]+)([A-Z]+)", line[4].replace(" ", "")
-                ).groups()
-                yield (
-                    datetime.date(*map(int, line[0].split("-"))),
-                    Decimal(f"{integral}.{fraction}"),
-                    currency,
-                    re.sub(r"\s+", " ", line[1].strip()),
-                )
+    connections = {}
+
+    for name, uri in configuration.get("connections", {}).items():
+        # furl does not round-trip sqlite:////absolute/path URIs.
+        if elevate:
+            from furl import furl
 
+            uri = furl(uri).set(username=username, password=password).tostr()
+        connections[name] = backends["gnucash"](uri, read_only=not elevate)
 
-def parse_santander_csv(fn):
-    with text(fn) as infile:
-        reader = csv.reader(infile, delimiter=",")
-        for line in reader:
-            if len(line) == 9 and DMY_pattern.match(line[0]):
-                yield (
-                    datetime.date(*map(int, reversed(line[1].split("-")))),
-                    Decimal(line[5].replace(",", ".")),
-                    "PLN",
-                    line[2].strip(),
-                )
+    return connections
 
 
-def parse_ing_csv(fn):
-    with text(fn) as infile:
-        reader = csv.reader(infile, delimiter=";")
-        for line in reader:
-            if len(line) == 21 and YMD_pattern.match(line[0]):
-                yield (
-                    datetime.date(*map(int, line[0].split("-"))),
-                    Decimal(line[8 if line[1] else 10].replace(",", ".")),
-                    "PLN",
-                    line[2].strip() + " " + line[3].strip(),
-                )
+def open_cache(options, no_cache):
+    if no_cache or options.get("cache", {}) is False:
+        return None
+    return StatementCache(**options.get("cache", {}))
 
 
-def parse_nest_csv(fn):
-    with text(fn) as infile:
-        reader = csv.reader(infile, delimiter=",")
-        for line in reader:
-            if len(line) > 9 and DMY_pattern.match(line[0]):
-                yield (
-                    datetime.date(*map(int, reversed(line[0].split("-")))),
-                    Decimal(line[3]),
-                    "PLN",
-                    line[7],
-                )
+def importers_of(configuration):
+    return {
+        name: (str(cfg["format"]), cfg.get("encoding"))
+        for name, cfg in configuration["importers"].items()
+    }
 
 
-def parse_revolut_csv(fn):
-    with text(fn) as infile:
-        reader = csv.reader(infile, delimiter=",")
-        for line in reader:
-            if YMD_pattern.match(line[2]):
-                yield (
-                    datetime.date(*map(int, line[2].split(" ")[0].split("-"))),
-                    Decimal(line[5]),
-                    line[7],
-                    line[4],
-                )
+def importer_named(configuration, name):
+    for importer in configuration["importers"]:
+        if str(importer) == str(name):
+            return importer
+    raise click.BadParameter(f"Unknown importer {name}.", param_hint="--target")
 
 
-def parse_toyota_xml(fn):
-    with open(fn, "rb") as infile:
-        for operacja in etree.parse(infile).getroot().findall(".//operacja"):
-            operacja = {child.tag: child.text for child in operacja.getchildren()}
-            yield (
-                datetime.date(*map(int, operacja["data_ksiegowa"].split("-"))),
-                (+1 if operacja["strona"] == "MA" else -1) * Decimal(operacja["kwota"]),
-                "PLN",
-                operacja["tresc1"],
+def detector_of(configuration):
+    return Detector(
+        {name: str(cfg["format"]) for name, cfg in configuration["importers"].items()},
+        signatures,
+    )
+
+
+def reconcile_statement(in_file, rows, cfg, connection, epsilon, splits=None):
+    if not rows:
+        return []
+
+    # Opening the book and indexing its accounts is profiled on its own.
+    accounts = list(connection.accounts(cfg["account"]))
+    reconciliation = Reconciliation(rows, epsilon=epsilon)
+    from_date, to_date = reconciliation.window
+
+    with profiling.profiler.stage("reconcile", in_file) as measurement:
+        messages = [
+            (
+                record.day,
+                format_amount(record.amount),
+                record.currency,
+                record.description,
+                status,
+                record,
             )
+            for record, status in reconciliation.reconcile(
+                profiling.profiler.iterate(
+                    "query",
+                    (splits or connection).transactions(
+                        *accounts,
+                        from_date=from_date,
+                        to_date=to_date,
+                    ),
+                    in_file,
+                )
+            )
+        ]
+        messages.sort(key=lambda message: message[:-1])
+        measurement.rows = len(messages)
 
+    return messages
 
-@click.command()
-@click.argument("statements", nargs=-1)
-@click.option(
+
+def collect_exports(messages, cfg, connection, echo):
+    for *_, status, record in messages:
+        if status == "EXPORT":
+            source_account = cfg["account"].replace("*", record.currency)
+            if source_account not in connection.index:
+                echo(f"Source account {source_account} could not be found.")
+                continue
+
+            target_account = cfg["update"].replace("*", record.currency)
+            if target_account not in connection.index:
+                echo(f"Target account {target_account} could not be found.")
+                continue
+
+            yield record, source_account, target_account
+
+
+def check_statement(in_file, rows, cfg, connection, epsilon, exporting, dry_run=False):
+    messages = reconcile_statement(in_file, rows, cfg, connection, epsilon)
+    warnings, exports, elapsed = [], [], None
+    if exporting:
+        exports = list(collect_exports(messages, cfg, connection, warnings.append))
+    # Written before the next statement of the book is reconciled, overlapping
+    # statements would export the same rows otherwise.
+    if exports:
+        elapsed = insert_export(connection, cfg["connection"], exports, dry_run)
+    return messages, exports, warnings, elapsed
+
+
+def insert_export(connection, name, transactions, dry_run):
+    start = time.perf_counter()
+    with profiling.profiler.stage("insert", name) as measurement:
+        connection.insert(transactions)
+        measurement.rows = len(transactions)
+
+    # A dry run leaves the rows flushed so that later statements of the book
+    # see them, closing the book rolls them back once at the end.
+    if not dry_run:
+        with profiling.profiler.stage("save", name):
+            connection.book.save()
+
+    return time.perf_counter() - start
+
+
+def echo_inserted(echo, name, transactions, elapsed, dry_run):
+    echo(
+        f"{'Checked' if dry_run else 'Inserted'} {len(transactions)} transactions"
+        f" into {name} in {elapsed:.2f} s"
+        f" ({len(transactions) / elapsed:.0f} rows/s)."
+    )
+
+
+class Inline:
+    # Executor running tasks right away, when books are used one at a time.
+
+    def submit(self, function, *args, **kwargs):
+        future = Future()
+        try:
+            future.set_result(function(*args, **kwargs))
+        except BaseException as error:
+            future.set_exception(error)
+        return future
+
+    def shutdown(self, wait=True):
+        pass
+
+
+def book_executors(connections, threads=1):
+    # A book session must stay on the thread that opened it (SQLite refuses
+    # anything else), so every book is bound to a single worker thread.
+    if threads == 1:
+        return dict.fromkeys(connections, Inline())
+
+    executors = [
+        ThreadPoolExecutor(1, thread_name_prefix=f"book-{index}")
+        for index in range(max(min(threads, len(connections)), 1))
+    ]
+    return {
+        name: executors[index % len(executors)]
+        for index, name in enumerate(connections)
+    }
+
+
+def close_books(connections, executors):
+    for future in [
+        executors[name].submit(connection.book.close)
+        for name, connection in connections.items()
+        if "book" in connection.__dict__
+    ]:
+        future.result()
+
+    for executor in {
+        id(executor): executor for executor in executors.values()
+    }.values():
+        executor.shutdown()
+
+
+class DefaultGroup(click.Group):
+    # Keeps `statements FILE...` working next to the other subcommands.
+    default = "reconcile"
+
+    def parse_args(self, ctx, args):
+        if not args or (
+            args[0] not in self.commands and args[0] not in ctx.help_option_names
+        ):
+            args = [self.default, *args]
+        return super().parse_args(ctx, args)
+
+
+configuration_option = click.option(
     "--configuration",
     "-c",
     type=click.File(encoding="utf-8"),
@@ -180,182 +277,425 @@ def parse_toyota_xml(fn):
     help="Configuration file (YAML).",
     required=True,
 )
-@click.option(
+
+elevate_option = click.option(
     "--elevate",
     "-e",
     is_flag=True,
     default=False,
     help="Ask for and use elevated credentials.",
 )
+
+format_option = click.option(
+    "--format",
+    "-f",
+    "output_format",
+    type=click.Choice(sorted(writers)),
+    default="table",
+    show_default=True,
+    help="Report format, csv and jsonl rows carry the statement file name.",
+)
+
+
+def common_options(function):
+    for option in reversed(
+        (
+            configuration_option,
+            elevate_option,
+            click.option(
+                "--update",
+                "-u",
+                is_flag=True,
+                default=False,
+                help="Update database with missing transactions.",
+            ),
+            click.option(
+                "--target",
+                "-i",
+                metavar="NAME",
+                help="Target for updates (detected by default).",
+            ),
+            click.option(
+                "--no-cache",
+                is_flag=True,
+                default=False,
+                help="Parse every statement even if a cached result exists.",
+            ),
+            click.option(
+                "--dry-run",
+                "-n",
+                is_flag=True,
+                default=False,
+                help="Go through updates without committing them.",
+            ),
+            format_option,
+        )
+    ):
+        function = option(function)
+    return function
+
+
+@click.group(cls=DefaultGroup)
+def cli():
+    pass
+
+
+@cli.command()
+@click.argument("statements", nargs=-1)
+@common_options
 @click.option(
-    "--update",
-    "-u",
-    is_flag=True,
-    default=False,
-    help="Update database with missing transactions.",
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=0),
+    default=1,
+    help="Detect and parse statements in N processes (0 for one per CPU).",
 )
 @click.option(
-    "--target",
-    "-i",
-    metavar="NAME",
-    help="Target for updates (detected by default).",
+    "--threads",
+    "-t",
+    type=click.IntRange(min=1),
+    default=1,
+    help="Open and query up to N books at once, each in its own thread.",
 )
-def cli(statements, configuration, elevate, update, target):
-    configuration = YAML().load(configuration)
-    epsilon = configuration.get("options", {}).get("epsilon", 7)
-
-    username, password = (
-        (input("Username: "), getpass("Password: ")) if elevate else (None, None)
+@click.option(
+    "--profile",
+    type=click.File("w", encoding="utf-8"),
+    metavar="FILE",
+    help="Write per-stage timings and peak memory as JSON.",
+)
+@click.option(
+    "--profile-dump",
+    type=click.Path(dir_okay=False, writable=True),
+    metavar="FILE",
+    help="Dump cProfile statistics of the run.",
+)
+def reconcile(
+    statements,
+    configuration,
+    elevate,
+    update,
+    target,
+    no_cache,
+    dry_run,
+    output_format,
+    jobs,
+    threads,
+    profile,
+    profile_dump,
+):
+    """Reconcile statements against GnuCash books."""
+    if profile or profile_dump:
+        profiling.enable()
+
+    if profile_dump:
+        statistics = cProfile.Profile()
+        statistics.enable()
+
+    configuration = load_configuration(configuration)
+    options = configuration.get("options", {})
+    epsilon = options.get("epsilon", 7)
+
+    cache = open_cache(options, no_cache)
+    connections = open_connections(configuration, elevate)
+
+    stdout = click.get_text_stream("stdout")
+    write, header = writers[output_format]
+    if header is not None:
+        header(stdout)
+
+    # Keep machine readable reports clean of progress and warning messages.
+    echo = partial(click.echo, err=output_format != "table")
+
+    executors = book_executors(connections, threads)
+    pending = deque()
+
+    def report(wait=False):
+        # Statements are reported in the order given, whichever book is first.
+        while pending and (wait or pending[0][-1].done()):
+            in_file, cfg, future = pending.popleft()
+            messages, collected, warnings, elapsed = future.result()
+
+            with profiling.profiler.stage("report", in_file):
+                write(messages, stdout, statement=in_file)
+                stdout.flush()
+
+            for warning in warnings:
+                echo(warning)
+            if collected:
+                echo_inserted(echo, cfg["connection"], collected, elapsed, dry_run)
+
+    detect = detector_of(configuration)
+    target = target and importer_named(configuration, target)
+    in_files, in_importers = [], []
+
+    for in_file in (in_file for pattern in statements for in_file in glob(pattern)):
+        with profiling.profiler.stage("detect", in_file):
+            try:
+                in_importers.append(target or detect(in_file))
+            except DetectionError as error:
+                click.echo(f"Skipping {in_file}: {error}", err=True)
+                continue
+        in_files.append(in_file)
+
+    load = partial(
+        load_statement,
+        importers=importers_of(configuration),
+        cache=cache,
+        profile=profiling.profiler.enabled,
     )
 
-    connections = {}
+    if jobs != 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+    try:
+        with (
+            ProcessPoolExecutor(jobs or None, initializer=profiling.reset)
+            if jobs != 1
+            else nullcontext()
+        ) as pool:
+            for in_file, (importer, rows, records) in zip(
+                in_files,
+                (pool.map if pool else map)(load, in_files, in_importers),
+            ):
+                profiling.profiler.extend(records)
+
+                cfg = configuration["importers"][importer]
+                pending.append(
+                    (
+                        in_file,
+                        cfg,
+                        executors[cfg["connection"]].submit(
+                            check_statement,
+                            in_file,
+                            rows,
+                            cfg,
+                            connections[cfg["connection"]],
+                            epsilon,
+                            update or dry_run,
+                            dry_run,
+                        ),
+                    )
+                )
+                report()
 
-    for name, uri in configuration.get("connections", {}).items():
-        uri = furl(uri)
-        if elevate:
-            uri.set(username=username, password=password)
-        connections[name] = GnuCash(uri.tostr(), read_only=not elevate)
-
-    parser = {
-        "mBank": parse_mbank_csv,
-        "Santander": parse_santander_csv,
-        "ING": parse_ing_csv,
-        "Toyota": parse_toyota_xml,
-        "Nest": parse_nest_csv,
-        "Revolut": parse_revolut_csv,
-    }
+        report(wait=True)
+    finally:
+        close_books(connections, executors)
 
-    for pattern in statements:
-        for in_file in glob(pattern):
-            target = target or detect_importer_from_file(in_file)
-            cfg = configuration["importers"][target]
+    if cache is not None:
+        with profiling.profiler.stage("evict"):
+            cache.evict()
 
-            messages = []
-            transactions = defaultdict(list)
+    if profile_dump:
+        statistics.disable()
+        statistics.dump_stats(profile_dump)
 
-            for date, amount, currency, description in parser[cfg["format"]](in_file):
-                transactions[(date, f"{amount:.2f}", currency)].append(
-                    unidecode(description)
-                )
+    if profile:
+        json.dump(profiling.profiler.summary(), profile, indent=2)
 
-            for (date, amount, currency), descriptions in transactions.items():
-                if len(descriptions) > 1:
-                    for description in descriptions:
-                        messages.append(
-                            (
-                                date,
-                                amount,
-                                currency,
-                                description,
-                                "DUPLICATE",
-                                Style.DIM,
-                            )
-                        )
-
-            delta = datetime.timedelta(days=epsilon)
-            from_date = min(transactions)[0]
-            to_date = max(transactions)[0]
-
-            connection = connections[cfg["connection"]]
-
-            for account in connection.accounts(cfg["account"]):
-                for date, amount, currency, description in connection.transactions(
-                    account, from_date=from_date - delta, to_date=to_date + delta
-                ):
-                    amount = f"{amount:.2f}"
-
-                    for shift in (
-                        int((x // 2 - x) * (x % 2 * 2 - 1))
-                        for x in range(epsilon * 2 + 1)
-                    ):
-                        shifted_date = date + datetime.timedelta(days=shift)
-                        if transactions.get((shifted_date, amount, currency)):
-                            transactions[(shifted_date, amount, currency)].pop()
-                            if shift:
-                                messages.append(
-                                    (
-                                        date,
-                                        amount,
-                                        currency,
-                                        description,
-                                        f"\N{RIGHTWARDS ARROW} {shifted_date}",
-                                        Style.DIM,
-                                    )
-                                )
-                            break
-                    else:
-                        if from_date <= date <= to_date:
-                            messages.append(
-                                (
-                                    date,
-                                    amount,
-                                    currency,
-                                    description,
-                                    "GNUCASH",
-                                    Fore.WHITE,
-                                )
-                            )
-
-            for (date, amount, currency), descriptions in transactions.items():
-                for description in descriptions:
-                    messages.append(
-                        (date, amount, currency, description, "EXPORT", Style.BRIGHT)
+
+@cli.command()
+@click.argument("directory", type=click.Path(exists=True, file_okay=False))
+@common_options
+@click.option(
+    "--interval",
+    type=click.FloatRange(min=0.1),
+    default=5.0,
+    show_default=True,
+    help="Seconds between directory scans.",
+)
+@click.option(
+    "--pattern",
+    default="*",
+    show_default=True,
+    help="Only pick up statements matching this glob.",
+)
+def watch(
+    directory,
+    configuration,
+    elevate,
+    update,
+    target,
+    no_cache,
+    dry_run,
+    output_format,
+    interval,
+    pattern,
+):
+    """Reconcile statements as they appear in DIRECTORY, keeping books open."""
+    configuration = load_configuration(configuration)
+    options = configuration.get("options", {})
+    epsilon = options.get("epsilon", 7)
+    importers = importers_of(configuration)
+
+    cache = open_cache(options, no_cache)
+    connections = open_connections(configuration, elevate)
+    splits = {name: SplitCache(connection) for name, connection in connections.items()}
+    fingerprints = {}
+
+    stdout = click.get_text_stream("stdout")
+    write, header = writers[output_format]
+    if header is not None:
+        header(stdout)
+
+    echo = partial(click.echo, err=output_format != "table")
+
+    scanner = DirectoryScanner(directory, pattern)
+    detect = detector_of(configuration)
+    target = target and importer_named(configuration, target)
+
+    try:
+        while True:
+            ready = scanner.scan()
+
+            # Only books opened by earlier passes can hold stale state.
+            for name, connection in connections.items():
+                if ready and "book" in connection.__dict__:
+                    fingerprint = connection.fingerprint()
+                    if fingerprints.get(name, fingerprint) != fingerprint:
+                        connection.book.session.rollback()
+                        splits[name].clear()
+                    fingerprints[name] = fingerprint
+
+            written = set()
+
+            for in_file in ready:
+                try:
+                    importer, rows, _ = load_statement(
+                        in_file, target or detect(in_file), importers, cache
                     )
+                    cfg = configuration["importers"][importer]
+                    connection = connections[cfg["connection"]]
+                    messages = reconcile_statement(
+                        in_file,
+                        rows,
+                        cfg,
+                        connection,
+                        epsilon,
+                        splits=splits[cfg["connection"]],
+                    )
+                except Exception as error:
+                    click.echo(f"Skipping {in_file}: {error!r}", err=True)
+                    continue
+
+                write(messages, stdout, statement=in_file)
+                stdout.flush()
+
+                exports = []
+                if update or dry_run:
+                    exports = list(collect_exports(messages, cfg, connection, echo))
+
+                # Later statements of the pass have to see these rows.
+                if exports:
+                    name = cfg["connection"]
+                    elapsed = insert_export(connection, name, exports, dry_run)
+                    echo_inserted(echo, name, exports, elapsed, dry_run)
+                    splits[name].clear()
+                    written.add(name)
+
+            for name, connection in connections.items():
+                # The book stays open between passes, so a dry run must not
+                # hold on to its write transaction.
+                if dry_run and name in written:
+                    connection.book.session.rollback()
+                    splits[name].clear()
+                if "book" in connection.__dict__ and (
+                    name in written or name not in fingerprints
+                ):
+                    fingerprints[name] = connection.fingerprint()
 
-            print(
-                tabulate.tabulate(
-                    [
-                        (
-                            color + str(date),
-                            amount,
-                            currency,
-                            description[:140],
-                            status + Style.RESET_ALL,
-                        )
-                        for date, amount, currency, description, status, color in sorted(
-                            messages
-                        )
-                    ],
-                    headers=("Date", "Amount", "Currency", "Description", "Status"),
-                    floatfmt=".2f",
-                )
-            )
+            if ready and cache is not None:
+                cache.evict()
 
-            if update:
-                book = connections[cfg["connection"]].book
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        pass
 
-                for date, amount, currency, description, status, color in sorted(
-                    messages
-                ):
-                    if status == "EXPORT":
-                        try:
-                            fn = cfg["account"].replace("*", currency)
-                            source = book.accounts(fullname=fn)
-                        except KeyError:
-                            print(f"Source account {fn} could not be found.")
-                            continue
-
-                        try:
-                            fn = cfg["update"].replace("*", currency)
-                            target = book.accounts(fullname=fn)
-                        except KeyError:
-                            print(f"Target account {fn} could not be found.")
-                            continue
-
-                        transaction = Transaction(
-                            currency=book.commodities(
-                                namespace="CURRENCY", mnemonic=currency
-                            ),
-                            description=description,
-                            post_date=date,
-                            splits=[
-                                Split(account=source, value=Decimal(amount)),
-                                Split(account=target, value=-Decimal(amount)),
-                            ],
-                        )
-                        book.session.add(transaction)
-                book.flush()
-                book.save()
+
+@cli.command()
+@click.argument("pattern")
+@configuration_option
+@elevate_option
+@click.option(
+    "--connection",
+    "-b",
+    "name",
+    metavar="NAME",
+    help="Connection to query (required if more than one is configured).",
+)
+@click.option("--from", "from_date", type=click.DateTime(("%Y-%m-%d",)))
+@click.option("--to", "to_date", type=click.DateTime(("%Y-%m-%d",)))
+@click.option(
+    "--period",
+    "-p",
+    type=click.Choice(("day", "month", "total")),
+    default="month",
+    show_default=True,
+    help="Group totals and running balances by this period.",
+)
+@format_option
+def balances(
+    pattern, configuration, elevate, name, from_date, to_date, period, output_format
+):
+    """Show balances and period totals of accounts matching PATTERN."""
+    configuration = load_configuration(configuration)
+    connections = open_connections(configuration, elevate)
+
+    if name is None:
+        if len(connections) != 1:
+            raise click.UsageError("Choose a connection with --connection.")
+        (name,) = connections
+    elif name not in connections:
+        raise click.BadParameter(f"Unknown connection {name}.", param_hint="NAME")
+
+    connection = connections[name]
+    accounts = list(connection.accounts(pattern))
+    if not accounts:
+        raise click.UsageError(f"No accounts match {pattern}.")
+
+    from_date = from_date and from_date.date()
+    to_date = to_date and to_date.date()
+
+    labels = {
+        "day": str,
+        "month": lambda date: date.strftime("%Y-%m"),
+        "total": lambda date: "total",
+    }
+
+    opening = (
+        connection.balance(*accounts, to_date=from_date - datetime.timedelta(1))
+        if from_date is not None
+        else {}
+    )
+    rows = [
+        ("opening", currency, None, None, format_amount(balance))
+        for currency, balance in sorted(opening.items())
+    ]
+    rows.extend(
+        (
+            labels[period](date),
+            currency,
+            count,
+            format_amount(total),
+            format_amount(balance),
+        )
+        for date, currency, count, total, balance in connection.totals(
+            *accounts, period=period, from_date=from_date, to_date=to_date
+        )
+    )
+    rows.extend(
+        ("closing", currency, None, None, format_amount(balance))
+        for currency, balance in sorted(
+            connection.balance(*accounts, to_date=to_date).items()
+        )
+    )
+
+    write_summary(
+        ("Period", "Currency", "Splits", "Total", "Balance"),
+        rows,
+        click.get_text_stream("stdout"),
+        output_format,
+    )
 
 
 if __name__ == "__main__":
@@ -0,0 +1,38 @@
+import mmap
+import datetime
+
+from contextlib import nullcontext
+
+from lxml import etree
+
+from webcash.utils.parsers import version
+from webcash.utils.records import Record, minor_units
+
+
+def mapped(infile):
+    try:
+        return mmap.mmap(infile.fileno(), 0, access=mmap.ACCESS_READ)
+    except ValueError:
+        # Empty files cannot be mapped.
+        return nullcontext(infile)
+
+
+@version(2)
+def parse_toyota_xml(fn, encoding=None):
+    with open(fn, "rb") as infile, mapped(infile) as source:
+        for _, operacja in etree.iterparse(source, tag="operacja", encoding=encoding):
+            fields = {child.tag: child.text for child in operacja}
+
+            # Drop what has been parsed so far to keep memory bounded.
+            operacja.clear(keep_tail=True)
+            while operacja.getprevious() is not None:
+                del operacja.getparent()[0]
+
+            yield Record(
+                datetime.date(
+                    *map(int, fields["data_ksiegowa"].split("-"))
+                ).toordinal(),
+                (+1 if fields["strona"] == "MA" else -1) * minor_units(fields["kwota"]),
+                "PLN",
+                fields["tresc1"],
+            )
@@ -0,0 +1,85 @@
+import os
+import datetime
+
+from fnmatch import fnmatch
+
+
+class DirectoryScanner:
+    def __init__(self, path, pattern="*"):
+        self.path = path
+        self.pattern = pattern
+        self.seen = {}
+        self.pending = {}
+
+    def signatures(self):
+        signatures = {}
+        with os.scandir(self.path) as entries:
+            for entry in entries:
+                if entry.name.startswith(".") or not fnmatch(entry.name, self.pattern):
+                    continue
+                if entry.is_file():
+                    stat = entry.stat()
+                    signatures[entry.path] = stat.st_mtime_ns, stat.st_size
+        return signatures
+
+    def scan(self):
+        # A file is ready once it is new or changed and has not moved since the
+        # previous scan, so statements still being copied in are left alone.
+        signatures = self.signatures()
+        ready = sorted(
+            fn
+            for fn, signature in signatures.items()
+            if signature != self.seen.get(fn) and signature == self.pending.get(fn)
+        )
+
+        for fn in ready:
+            self.seen[fn] = signatures[fn]
+        for fn in self.seen.keys() - signatures.keys():
+            del self.seen[fn]
+
+        self.pending = signatures
+        return ready
+
+
+class SplitCache:
+    def __init__(self, connection):
+        self.connection = connection
+        self.windows = {}
+
+    def clear(self):
+        self.windows.clear()
+
+    def fetch(self, accounts, from_date, to_date):
+        return list(
+            self.connection.transactions(
+                *accounts, from_date=from_date, to_date=to_date
+            )
+        )
+
+    def transactions(self, *accounts, from_date, to_date):
+        key = tuple(sorted(accounts))
+        window = self.windows.get(key)
+
+        # Records are kept newest first, like GnuCash.transactions yields them,
+        # and the window only grows by the days that were not fetched yet.
+        if window is None:
+            window = self.windows[key] = [
+                from_date,
+                to_date,
+                self.fetch(accounts, from_date, to_date),
+            ]
+        else:
+            first, last, records = window
+            if from_date < first:
+                records.extend(
+                    self.fetch(accounts, from_date, first - datetime.timedelta(1))
+                )
+                window[0] = from_date
+            if to_date > last:
+                records[:0] = self.fetch(
+                    accounts, last + datetime.timedelta(1), to_date
+                )
+                window[1] = to_date
+
+        first, last = from_date.toordinal(), to_date.toordinal()
+        return [record for record in window[2] if first <= record.date <= last]
@@ -0,0 +1,58 @@
+from fnmatch import fnmatch
+
+import pytest
+
+from webcash.utils.accounts import AccountIndex
+
+
+class Account:
+    def __init__(self, fullname):
+        self.fullname = fullname
+
+
+names = [
+    "Assets",
+    "Assets:Current Assets",
+    "Assets:Current Assets:mBank",
+    "Assets:Current Assets:mBank:Savings",
+    "Assets:Current Assets:Santander",
+    "Assets:Cash",
+    "Expenses",
+    "Expenses:Food",
+    "Expenses:Food:Groceries",
+    "Expenses:Fuel",
+    "Income:Salary",
+]
+
+index = AccountIndex(Account(name) for name in names)
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        "Assets",
+        "Assets:Cash",
+        "Assets:*",
+        "Assets:Current Assets:*",
+        "Assets:*:mBank",
+        "Assets:Current Assets:[ms]*",
+        "Expenses:F??d",
+        "Expenses:F*",
+        "*:Food:*",
+        "*",
+        "Assets:Unknown:*",
+        "Missing",
+        "Expenses:Food:Groceries:*",
+    ],
+)
+def test_match(pattern):
+    assert sorted(index.match(pattern)) == sorted(
+        name for name in names if fnmatch(name, pattern)
+    )
+
+
+def test_lookup():
+    assert len(index) == len(names)
+    assert "Expenses:Fuel" in index
+    assert "Expenses:Gas" not in index
+    assert index["Assets:Cash"].fullname == "Assets:Cash"
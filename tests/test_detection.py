@@ -0,0 +1,82 @@
+import codecs
+
+from webcash.utils.detection import Detector
+from webcash.utils.parsers import signatures
+
+mbank = "12 3456 7890 1234 5678 9012 3456"
+santander = "98 7654 3210 9876 5432 1098 7654"
+
+detector = Detector(
+    {
+        mbank: "mBank",
+        santander: "Santander",
+        "toyota": "Toyota",
+        "revolut": "Revolut",
+    },
+    signatures,
+)
+
+mbank_rows = "2024-05-10;2024-05-10;Coffee;;;-12,50;1000,00\n"
+santander_rows = "10-05-2024,10-05-2024,Coffee,,,,-12.50,1000.00,1\n"
+
+
+def head(text, encoding="latin-1"):
+    return text.encode(encoding)
+
+
+def test_configured_iban():
+    assert detector.classify(head(f"#Rachunek;{mbank};\n{mbank_rows}")) == mbank
+    assert detector.classify(head(f"{santander},{santander_rows}")) == santander
+
+
+def test_unknown_iban():
+    unknown = "11 2222 3333 4444 5555 6666 7777"
+    assert detector.classify(head(f"#Rachunek;{unknown};\n{mbank_rows}")) is None
+
+
+def test_unknown_iban_with_configured_counterparty():
+    unknown = "11 2222 3333 4444 5555 6666 7777"
+    text = f"{unknown},10-05-2024,Transfer {mbank},,,,-12.50,1000.00,1\n"
+    assert detector.classify(head(text)) is None
+
+    # The configured account still owns a file of its own format.
+    text = f"#Rachunek;{mbank};\n2024-05-10;;{unknown};;;-1,00;999,00\n"
+    assert detector.classify(head(text)) == mbank
+
+
+def test_counterparty_iban():
+    # Both accounts are configured, the format decides which one is the owner.
+    text = f"#Rachunek;{mbank};\n{mbank_rows}2024-05-11;;{santander};;;-1,00;999,00\n"
+    assert detector.classify(head(text)) == mbank
+
+
+def test_signature_without_iban():
+    assert detector.classify(head('<operacje><operacja id="1"/>')) == "toyota"
+    text = "Type,Product,Started Date,Completed Date,Description\n"
+    assert detector.classify(head(text)) == "revolut"
+
+
+def test_ambiguous_format():
+    ambiguous = Detector({"first": "mBank", "second": "mBank"}, signatures)
+    assert ambiguous.classify(head(mbank_rows)) is None
+
+
+def test_unknown_format():
+    assert detector.classify(head("Date,Amount\n2024-05-10,1.00\n")) is None
+
+
+def test_incomplete_head():
+    text = f"#Rachunek;{mbank};\n{mbank_rows}2024-05-11;2024"
+    assert detector.classify(head(text), complete=False) == mbank
+
+
+def test_utf16_head():
+    text = f"#Rachunek;{mbank};\n{mbank_rows}"
+    assert detector.classify(codecs.BOM_UTF16_LE + head(text, "utf-16-le")) == mbank
+
+
+def test_leading_zero():
+    # YAML loads an unquoted account number as an integer.
+    configured = Detector({5114020040000300201355387: "mBank"}, signatures)
+    text = f"#Rachunek;05 1140 2004 0000 3002 0135 5387;\n{mbank_rows}"
+    assert configured.classify(head(text)) == 5114020040000300201355387
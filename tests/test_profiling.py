@@ -0,0 +1,27 @@
+import time
+
+from webcash.utils.profiling import Profiler
+
+
+def produce(profiler):
+    with profiler.stage("open_book"):
+        time.sleep(0.02)
+    yield 1
+    time.sleep(0.01)
+    yield 2
+
+
+def test_nested_stages_are_exclusive():
+    profiler = Profiler()
+
+    with profiler.stage("reconcile") as measurement:
+        rows = list(profiler.iterate("query", produce(profiler)))
+        measurement.rows = len(rows)
+
+    stages = {record["stage"]: record for record in profiler.records}
+    assert stages["query"]["rows"] == 2
+    assert stages["reconcile"]["rows"] == 2
+    assert stages["open_book"]["wall"] >= 0.02
+    assert 0.01 <= stages["query"]["wall"] < 0.02
+    assert stages["reconcile"]["wall"] < 0.01
+    assert profiler.summary()["stages"]["reconcile"]["calls"] == 1
@@ -0,0 +1,108 @@
+import random
+import datetime
+
+from webcash.utils.records import Record
+from webcash.utils.reconciliation import Reconciliation
+
+
+def record(day, amount=-1000, currency="PLN", description=""):
+    return Record(
+        datetime.date(2024, 5, day).toordinal(), amount, currency, description
+    )
+
+
+def probe(transactions, record, epsilon):
+    # The probing loop the bisection replaced: 0, -1, +1, -2, +2, ...
+    for shift in (int((x // 2 - x) * (x % 2 * 2 - 1)) for x in range(epsilon * 2 + 1)):
+        key = record.date + shift, record.amount, record.currency
+        if transactions.get(key):
+            transactions[key].pop()
+            return record.date + shift
+    return None
+
+
+def test_exact_date_first():
+    reconciliation = Reconciliation([record(9), record(10), record(11)])
+    assert reconciliation.match(record(10)) == record(10).date
+    assert reconciliation.match(record(10)) == record(9).date
+    assert reconciliation.match(record(10)) == record(11).date
+    assert reconciliation.match(record(10)) is None
+
+
+def test_earlier_of_equally_distant():
+    reconciliation = Reconciliation([record(12), record(8)])
+    assert reconciliation.match(record(10)) == record(8).date
+    assert reconciliation.match(record(10)) == record(12).date
+
+
+def test_nearest_wins():
+    reconciliation = Reconciliation([record(7), record(12)])
+    assert reconciliation.match(record(11)) == record(12).date
+
+
+def test_epsilon():
+    reconciliation = Reconciliation([record(1), record(20)], epsilon=3)
+    assert reconciliation.match(record(5)) is None
+    assert reconciliation.match(record(17)) == record(20).date
+    assert reconciliation.match(record(4)) == record(1).date
+
+
+def test_amount_and_currency():
+    reconciliation = Reconciliation([record(10)])
+    assert reconciliation.match(record(10, amount=-1001)) is None
+    assert reconciliation.match(record(10, currency="EUR")) is None
+    assert reconciliation.match(record(10)) == record(10).date
+
+
+def test_reconcile():
+    reconciliation = Reconciliation(
+        [record(3, -500), record(3, -500), record(10), record(20, -200)]
+    )
+    statuses = [
+        (entry.date, entry.amount, status)
+        for entry, status in reconciliation.reconcile(
+            [record(1, -100), record(12), record(15, -300), record(30, -300)]
+        )
+    ]
+    assert statuses == [
+        (record(3).date, -500, "DUPLICATE"),
+        (record(3).date, -500, "DUPLICATE"),
+        (record(12).date, -1000, "\N{RIGHTWARDS ARROW} 2024-05-10"),
+        (record(15).date, -300, "GNUCASH"),
+        (record(3).date, -500, "EXPORT"),
+        (record(3).date, -500, "EXPORT"),
+        (record(20).date, -200, "EXPORT"),
+    ]
+
+
+def test_window():
+    reconciliation = Reconciliation([record(10), record(20)], epsilon=2)
+    assert reconciliation.window == (
+        datetime.date(2024, 5, 8),
+        datetime.date(2024, 5, 22),
+    )
+
+
+def test_probing_loop():
+    generator = random.Random(0)
+
+    for _ in range(200):
+        epsilon = generator.randint(0, 5)
+        statement = [
+            record(generator.randint(1, 31), generator.choice((-100, -200)))
+            for _ in range(generator.randint(1, 15))
+        ]
+        book = [
+            record(generator.randint(1, 31), generator.choice((-100, -200)))
+            for _ in range(generator.randint(1, 15))
+        ]
+
+        transactions = {}
+        for entry in statement:
+            transactions.setdefault(
+                (entry.date, entry.amount, entry.currency), []
+            ).append(entry)
+
+        reconciliation = Reconciliation(statement, epsilon)
+        for entry in book:
+            assert reconciliation.match(entry) == probe(transactions, entry, epsilon)
@@ -0,0 +1,51 @@
+import pytest
+
+from webcash.utils.records import format_amount, minor_units, minor_units_of
+
+
+@pytest.mark.parametrize(
+    "amount, expected",
+    [
+        ("0", 0),
+        ("1", 100),
+        ("1.5", 150),
+        ("1.50", 150),
+        ("-0.01", -1),
+        ("+2.30", 230),
+        (".5", 50),
+        ("-12345.67", -1234567),
+        ("1.005", 100),
+        ("1.015", 102),
+        ("-1.005", -100),
+        ("1.0051", 101),
+        ("1e2", 10000),
+    ],
+)
+def test_minor_units(amount, expected):
+    assert minor_units(amount) == expected
+
+
+@pytest.mark.parametrize(
+    "numerator, denominator, expected",
+    [
+        (5, 1, 500),
+        (-15, 10, -150),
+        (1234, 100, 1234),
+        (1005, 1000, 100),
+        (1015, 1000, 102),
+        (-1005, 1000, -100),
+        (1006, 1000, 101),
+        (1, 3, 33),
+        (2, 3, 67),
+    ],
+)
+def test_minor_units_of(numerator, denominator, expected):
+    assert minor_units_of(numerator, denominator) == expected
+
+
+@pytest.mark.parametrize(
+    "amount, expected",
+    [(0, "0.00"), (5, "0.05"), (-1, "-0.01"), (150, "1.50"), (-123456, "-1234.56")],
+)
+def test_format_amount(amount, expected):
+    assert format_amount(amount) == expected
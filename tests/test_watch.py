@@ -0,0 +1,66 @@
+import datetime
+
+from webcash.utils.records import Record
+from webcash.utils.watch import SplitCache
+
+
+class Connection:
+    def __init__(self, records):
+        self.records = sorted(records, key=lambda record: -record.date)
+        self.requests = []
+
+    def transactions(self, *accounts, from_date, to_date):
+        self.requests.append((accounts, from_date, to_date))
+        first, last = from_date.toordinal(), to_date.toordinal()
+        for record in self.records:
+            if first <= record.date <= last:
+                yield record
+
+
+def day(number):
+    return datetime.date(2024, 5, number)
+
+
+def record(number):
+    return Record(day(number).toordinal(), -100, "PLN", str(number))
+
+
+def test_window_growth():
+    connection = Connection(record(number) for number in range(1, 31))
+    splits = SplitCache(connection)
+
+    def transactions(first, last):
+        return [
+            int(entry.description)
+            for entry in splits.transactions(
+                "b", "a", from_date=day(first), to_date=day(last)
+            )
+        ]
+
+    assert transactions(10, 15) == [15, 14, 13, 12, 11, 10]
+    assert transactions(11, 14) == [14, 13, 12, 11]
+    assert transactions(5, 12) == [12, 11, 10, 9, 8, 7, 6, 5]
+    assert transactions(13, 20) == [20, 19, 18, 17, 16, 15, 14, 13]
+    assert transactions(1, 25) == list(range(25, 0, -1))
+
+    assert connection.requests == [
+        (("b", "a"), day(10), day(15)),
+        (("b", "a"), day(5), day(9)),
+        (("b", "a"), day(16), day(20)),
+        (("b", "a"), day(1), day(4)),
+        (("b", "a"), day(21), day(25)),
+    ]
+
+
+def test_accounts_and_clear():
+    connection = Connection([record(10)])
+    splits = SplitCache(connection)
+
+    splits.transactions("a", from_date=day(1), to_date=day(20))
+    splits.transactions("a", "b", from_date=day(1), to_date=day(20))
+    splits.transactions("a", from_date=day(1), to_date=day(20))
+    assert len(connection.requests) == 2
+
+    splits.clear()
+    splits.transactions("a", from_date=day(1), to_date=day(20))
+    assert len(connection.requests) == 3